@@ -0,0 +1,121 @@
+import argparse
+import os
+import random
+import pandas as pd
+from fitz import open as fitz_open, Rect
+
+# Keywords of every kind the analyser handles, each with texts it matches
+MENTIONS = {
+    'peer effect': ['peer effects', 'peer effect', 'Peer effects'],
+    'linear in means': ['linear in means'],
+    'social multiplier': ['social multipliers', 'social multiplier'],
+    'LATE *U': ['LATE', 'LATEs'],
+    'OLS *U': ['OLS'],
+    'Manski 1993 / reflection problem *C': ['Manski 1993', '(Manski, 1993)', 'reflection problem'],
+    'Angrist, Pischke 2009 / mostly harmless *C': ['(Angrist, Pischke 2009)', 'Mostly Harmless'],
+}
+
+# Filler that none of the keywords match
+VOCABULARY = ("the of and to in a is that for on with as was by we are this be from at an which our "
+              "model data results estimate sample students school outcomes effect treatment group "
+              "table column standard errors clustered level specification controls baseline survey "
+              "wage income labor market policy households regression coefficient variation share").split()
+
+PAGE_RECT = Rect(50, 50, 545, 792)
+
+# Characters per line, short enough that insert_textbox never wraps a line of 8pt text itself
+LINE_CHARS = 90
+
+
+# Text of one page: words of filler with `density` keyword mentions at random places
+# Lines are broken between tokens, so a mention of several words is never split over two lines
+def page_text(rng, words, density):
+    tokens = [rng.choice(VOCABULARY) for _ in range(words)]
+    mentions = []
+    for _ in range(density):
+        keyword = rng.choice(list(MENTIONS))
+        mentions.append(keyword)
+        tokens.insert(rng.randrange(len(tokens)), rng.choice(MENTIONS[keyword]))
+
+    # Break the filler into sentences so the tokenizer has some work to do
+    for i in range(12, len(tokens), 15):
+        tokens[i] += '.'
+    tokens[-1] += '.'
+
+    lines = [tokens[0]]
+    for token in tokens[1:]:
+        if len(lines[-1]) + 1 + len(token) > LINE_CHARS:
+            lines.append(token)
+        else:
+            lines[-1] += ' ' + token
+    return '\n'.join(lines), mentions
+
+
+def generate_corpus(folder, docs=20, pages=10, density=3, words=400, seed=0):
+    """
+    Writes a synthetic corpus for PDFHighlighter.
+
+    Parameters:
+    - folder (str): Directory for the corpus, created if needed.
+    - docs (int): Number of PDFs.
+    - pages (int): Pages per PDF.
+    - density (int): Keyword mentions per page.
+    - words (int): Words of filler per page.
+    - seed (int): Seed of the random generator, so the same arguments give the same corpus.
+
+    Returns:
+    - dict: Paths of the "pdfs" folder, "keywords" file and "articles" CSV, with the number of
+      "pages" and the "mentions" written per keyword.
+    """
+    rng = random.Random(seed)
+    pdf_folder = os.path.join(folder, 'pdfs')
+    os.makedirs(pdf_folder, exist_ok=True)
+
+    articles = []
+    mentions = dict.fromkeys(MENTIONS, 0)
+
+    for doc_id in range(docs):
+        doi = f"10.9999/bench.{doc_id}"
+        pdf_document = fitz_open()
+        for _ in range(pages):
+            text, page_mentions = page_text(rng, words, density)
+            if pdf_document.new_page().insert_textbox(PAGE_RECT, text, fontsize=8) < 0:
+                raise ValueError(f"{words} words don't fit on a page")
+            for keyword in page_mentions:
+                mentions[keyword] += 1
+        pdf_document.save(os.path.join(pdf_folder, doi.replace('/', '_') + '.pdf'))
+        pdf_document.close()
+
+        articles.append({'DOI_link': doi, 'Title': f"Benchmark article {doc_id}",
+                         'Authors': "A Author, B Author", 'Publisher': "American Economic *"})
+
+    keywords_path = os.path.join(folder, 'keywords.txt')
+    with open(keywords_path, 'w') as file:
+        file.write('\n'.join(MENTIONS))
+
+    articles_path = os.path.join(folder, 'articles.csv')
+    pd.DataFrame(articles).to_csv(articles_path, index=False)
+
+    return {'pdfs': pdf_folder, 'keywords': keywords_path, 'articles': articles_path,
+            'pages': docs * pages, 'mentions': mentions}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Synthetic PDF corpus for benchmarking')
+    parser.add_argument('-o', '--output', type=str, default='./bench_corpus', help='Directory for the corpus')
+    parser.add_argument('-n', '--docs', type=int, default=20, help='Number of PDFs')
+    parser.add_argument('-p', '--pages', type=int, default=10, help='Pages per PDF')
+    parser.add_argument('-d', '--density', type=int, default=3, help='Keyword mentions per page')
+    parser.add_argument('--words', type=int, default=400, help='Words of filler per page')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    corpus = generate_corpus(args.output, args.docs, args.pages, args.density, args.words, args.seed)
+    print(f"Wrote {args.docs} PDFs with {corpus['pages']} pages to {corpus['pdfs']}")
+    for keyword, count in corpus['mentions'].items():
+        print(f"  {keyword}: {count} mentions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lit_inquiry import search
+from lit_inquiry.article_download import HTTPDownloader
+from lit_inquiry.article_analyser import PDFHighlighter
+from corpus import generate_corpus
+from servers import FakeSerp, PDFHost
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Metrics compared with the baseline, and whether higher is better
+COMPARED = {'requests_per_sec': True, 'mb_per_sec': True, 'pages_per_sec': True, 'matches_per_sec': True,
+            'p50_ms': False, 'p90_ms': False, 'peak_rss_mb': False}
+
+
+# Nearest-rank percentile of a list of seconds, in milliseconds
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return 1000 * values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def latencies(values):
+    return {f'p{q}_ms': round(percentile(values, q), 2) for q in (50, 90, 99)}
+
+
+# Peak resident memory of this process and its finished children so far, in MB
+def peak_rss_mb():
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+              resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(rss / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+
+
+# Wraps a function so the duration of every call is appended to times
+def timed(function, times):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            times.append(time.perf_counter() - start)
+    return wrapper
+
+
+def bench_search(args):
+    serp = FakeSerp(args.recording, args.results, args.serp_latency).start()
+    search.SERP_URL = serp.url + "/search"
+    queries = [(f"benchmark query {i} source:\"American Economic *\"", None) for i in range(args.queries)]
+
+    times = []
+    fetch_page = search.fetch_page
+    search.fetch_page = timed(fetch_page, times)
+    try:
+        start = time.perf_counter()
+        results = sum(len(entries) for _, entries in
+                      search.iter_scholar_data(queries, 'benchmark', '1800', '2023', workers=args.workers))
+        seconds = time.perf_counter() - start
+    finally:
+        search.fetch_page = fetch_page
+        serp.stop()
+
+    return {'requests': serp.requests, 'results': results, 'seconds': round(seconds, 3),
+            'requests_per_sec': round(serp.requests / seconds, 1), **latencies(times), 'peak_rss_mb': peak_rss_mb()}
+
+
+def bench_download(args, corpus, workdir):
+    host = PDFHost(corpus['pdfs'], args.pdf_latency).start()
+    dois = [name[:-4].replace('_', '/', 1) for name in sorted(os.listdir(corpus['pdfs']))]
+    folder = os.path.join(workdir, 'downloads')
+
+    times = []
+    downloader = HTTPDownloader(folder, args.workers, host.url_template)
+    downloader.download = timed(downloader.download, times)
+    try:
+        start = time.perf_counter()
+        statuses = [status for _, status, _ in downloader.download_all(dois)]
+        seconds = time.perf_counter() - start
+    finally:
+        host.stop()
+
+    size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+    return {'requests': host.requests, 'downloaded': statuses.count('ok'), 'seconds': round(seconds, 3),
+            'requests_per_sec': round(host.requests / seconds, 1), 'mb_per_sec': round(size / 1024 ** 2 / seconds, 2),
+            **latencies(times), 'peak_rss_mb': peak_rss_mb()}
+
+
+def bench_analyse(args, corpus, workdir):
+    # Scanned on a copy, so highlighting doesn't change the corpus for the next run
+    folder = os.path.join(workdir, 'analysed')
+    shutil.copytree(corpus['pdfs'], folder)
+
+    highlighter = PDFHighlighter(folder, corpus['articles'], corpus['keywords'], args.analysis_workers,
+                                 highlight=args.highlight, output_dir=os.path.join(workdir, 'highlighted'))
+    times = []
+    matches = 0
+    failed = 0
+
+    start = time.perf_counter()
+    last = start
+    for _, record, error, _ in highlighter.iter_records():
+        now = time.perf_counter()
+        times.append(now - last)
+        last = now
+        if error:
+            failed += 1
+        else:
+            matches += sum(1 for page in record[1] if page)
+    seconds = time.perf_counter() - start
+
+    expected = sum(corpus['mentions'].values())
+    if matches != expected:
+        print(f"Warning: found {matches} matches, the corpus has {expected}")
+
+    return {'documents': len(times), 'failed': failed, 'pages': corpus['pages'], 'matches': matches,
+            'seconds': round(seconds, 3), 'pages_per_sec': round(corpus['pages'] / seconds, 1),
+            'matches_per_sec': round(matches / seconds, 1), **latencies(times), 'peak_rss_mb': peak_rss_mb()}
+
+
+# Metrics that got worse than the baseline by more than the tolerance
+def compare(report, baseline, tolerance):
+    regressions = []
+    print(f"\n{'stage':<10}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>9}")
+
+    for stage, metrics in report['stages'].items():
+        for metric, higher_is_better in COMPARED.items():
+            old = baseline.get('stages', {}).get(stage, {}).get(metric)
+            new = metrics.get(metric)
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > tolerance else ""
+            print(f"{stage:<10}{metric:<18}{old:>12}{new:>12}{change:>+9.0%}{flag}")
+            if worse > tolerance:
+                regressions.append((stage, metric, old, new))
+
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmarks of the search, download and analysis stages')
+    parser.add_argument('-s', '--stages', type=str, default='search,download,analyse',
+                        help='Comma-separated stages to run')
+    parser.add_argument('-n', '--docs', type=int, default=20, help='PDFs in the synthetic corpus')
+    parser.add_argument('-p', '--pages', type=int, default=10, help='Pages per PDF')
+    parser.add_argument('-d', '--density', type=int, default=3, help='Keyword mentions per page')
+    parser.add_argument('-q', '--queries', type=int, default=20, help='Searches sent to the fake SERP API')
+    parser.add_argument('--results', type=int, default=100, help='Synthetic results per search')
+    parser.add_argument('--recording', type=str, default=None, help='Recorded SERP API pages to serve instead of synthetic ones')
+    parser.add_argument('--serp_latency', type=float, default=0.02, help='Seconds added to every SERP API response')
+    parser.add_argument('--pdf_latency', type=float, default=0.01, help='Seconds added to every PDF response')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='Concurrent requests for search and download')
+    parser.add_argument('--analysis_workers', type=int, default=1, help='Processes scanning PDFs')
+    parser.add_argument('--highlight', type=str, default='copy', choices=['inplace', 'copy', 'none'],
+                        help='Highlight mode of the analysis stage')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Runs of each stage, the fastest one is reported')
+    parser.add_argument('-o', '--output', type=str, default=None, help='Write the report to this JSON file')
+    parser.add_argument('--baseline', type=str, default=BASELINE, help='Baseline report to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='Share a metric may get worse before it counts as a regression')
+    parser.add_argument('--update_baseline', action='store_true', help='Save this run as the new baseline')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    config = {key: value for key, value in vars(args).items()
+              if key not in ('stages', 'repeat', 'output', 'baseline', 'tolerance', 'update_baseline')}
+    report = {'config': config, 'stages': {}}
+
+    workdir = tempfile.mkdtemp(prefix='lit_inquiry_bench_')
+    try:
+        corpus = None
+        if 'download' in stages or 'analyse' in stages:
+            corpus = generate_corpus(os.path.join(workdir, 'corpus'), args.docs, args.pages, args.density)
+
+        for stage in stages:
+            print(f"Running the {stage} benchmark...")
+            runs = []
+            for run in range(args.repeat):
+                rundir = os.path.join(workdir, f"{stage}_{run}")
+                os.makedirs(rundir)
+                if stage == 'search':
+                    runs.append(bench_search(args))
+                elif stage == 'download':
+                    runs.append(bench_download(args, corpus, rundir))
+                elif stage == 'analyse':
+                    runs.append(bench_analyse(args, corpus, rundir))
+                else:
+                    raise ValueError(f"Unknown stage {stage}")
+
+            # The fastest run is the one least disturbed by the rest of the machine
+            report['stages'][stage] = min(runs, key=lambda metrics: metrics['seconds'])
+            print(json.dumps(report['stages'][stage], indent=2))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with, save one with --update_baseline")
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get('config') != config:
+        print("Warning: the baseline was run with different settings, so the comparison may not mean much")
+
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
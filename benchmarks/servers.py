@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+
+class LocalServer:
+    # Threaded HTTP server on a free local port, running in the background
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.server.owner = self
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def count(self):
+        with self.lock:
+            self.requests += 1
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send(self, status, body=b'', content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SerpHandler(Handler):
+    def do_GET(self):
+        serp = self.server.owner
+        serp.count()
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        time.sleep(serp.latency)
+
+        results = serp.results_for(params.get('q', ''), params.get('cites'))
+        start = int(params.get('start', 0))
+        num = int(params.get('num', 20))
+        body = {"organic_results": results[start:start + num],
+                "search_information": {"total_results": len(results)}}
+        self.send(200, json.dumps(body).encode())
+
+
+class FakeSerp(LocalServer):
+    """
+    Stand-in for the SERP API.
+
+    Serves the pages of a recording made with record_queries when given one, and otherwise
+    synthetic results shaped like Google Scholar's, the same ones for the same query.
+    """
+    def __init__(self, recording=None, results_per_query=100, latency=0.0):
+        super().__init__(SerpHandler)
+        self.results_per_query = results_per_query
+        self.latency = latency # Seconds added to every response
+        self.recording = {}
+        if recording:
+            with open(recording) as file:
+                self.recording = json.load(file)
+
+    def results_for(self, query, cites=None):
+        key = f"{query}|{cites or ''}"
+        if self.recording:
+            return self.recording.get(key, [])
+
+        seed = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16)
+        return [synthetic_result(seed, i) for i in range(self.results_per_query)]
+
+
+def synthetic_result(seed, i):
+    article = f"{seed:x}{i:04d}"
+    return {
+        "title": f"Synthetic article {article}",
+        "result_id": article,
+        "link": f"https://www.aeaweb.org/articles?id=10.1257/aer.{article}",
+        "snippet": "… peer effects in the classroom …",
+        "publication_info": {"summary": "A Author, B Author - American Economic Review, 2015 - aeaweb.org"},
+        "inline_links": {
+            "cited_by": {"total": i, "cites_id": str(seed * 10000 + i),
+                         "link": f"https://scholar.google.com/scholar?cites={seed * 10000 + i}"},
+            "versions": {"total": 2, "cluster_id": str(seed * 10000 + i)},
+        },
+    }
+
+
+# Fetches every page of the queries from the real SERP API into a recording for FakeSerp
+def record_queries(queries, api_key, path, year_lo="1800", year_hi="2023"):
+    from lit_inquiry.search import build_params, fetch_page, RESULTS_PER_PAGE
+
+    recording = {}
+    for keyword, cites in queries:
+        results = []
+        while True:
+            data = fetch_page(build_params(keyword, api_key, year_lo, year_hi, cites, len(results)))
+            page = data.get('organic_results', [])
+            results.extend(page)
+            if len(page) < RESULTS_PER_PAGE:
+                break
+        recording[f"{keyword}|{cites or ''}"] = results
+
+    with open(path, 'w') as file:
+        json.dump(recording, file)
+
+
+class PDFHandler(Handler):
+    def do_GET(self):
+        host = self.server.owner
+        host.count()
+        time.sleep(host.latency)
+
+        # /<doi> is served from <folder>/<doi with '/' as '_'>.pdf
+        name = unquote(urlparse(self.path).path.lstrip('/')).replace('/', '_') + '.pdf'
+        path = os.path.join(host.folder, name)
+        if not os.path.isfile(path):
+            self.send(404)
+            return
+
+        with open(path, 'rb') as file:
+            self.send(200, file.read(), 'application/pdf')
+
+
+class PDFHost(LocalServer):
+    # Serves a folder of PDFs the way article_download.py expects, at <url>/<doi>
+    def __init__(self, folder, latency=0.0):
+        super().__init__(PDFHandler)
+        self.folder = folder
+        self.latency = latency # Seconds added to every response
+
+    @property
+    def url_template(self):
+        return self.url + "/{doi}"
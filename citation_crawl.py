@@ -0,0 +1,5 @@
+# Command-line entry point, the code is in lit_inquiry/citation_crawl.py
+from lit_inquiry.citation_crawl import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Search Google Scholar through the SERP API, download the PDFs of the articles found and scan them for keywords.
+
+The scripts at the root of the repository run each step from the command line. The same steps can be used
+from Python without going through argparse:
+
+    from lit_inquiry import search_articles, aea_dois, Downloader, PDFHighlighter
+
+    df = search_articles(["peer effects"], API_KEY, journals=["American Economic Review"])
+    Downloader("all_pdfs").download(aea_dois(df))
+    PDFHighlighter("all_pdfs", "serp_articles_data.csv", "keywords.txt").write_results("key_words_freq.csv")
+
+Names are imported from their modules the first time they are used, so importing the package is cheap.
+"""
+import importlib
+
+# Module of each name of the API
+API = {
+    'search_articles': 'search',
+    'iter_search': 'search',
+    'QueryPlanner': 'search',
+    'Downloader': 'article_download',
+    'HTTPDownloader': 'article_download',
+    'BrowserPool': 'article_download',
+    'aea_dois': 'article_download',
+    'download_pdfs': 'article_download',
+    'PDFHighlighter': 'article_analyser',
+    'KeywordMatcher': 'article_analyser',
+    'PDFIndex': 'pdf_index',
+    'CitationCrawler': 'citation_crawl',
+    'Pipeline': 'pipeline',
+    'DownloadManifest': 'download_manifest',
+    'ResponseCache': 'serp_cache',
+    'AnalysisCache': 'analysis_cache',
+    'ResultWriter': 'article_io',
+    'read_articles': 'article_io',
+}
+
+__all__ = list(API)
+
+
+def __getattr__(name):
+    if name in API:
+        return getattr(importlib.import_module('.' + API[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
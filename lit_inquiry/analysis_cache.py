@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from array import array
+
+# Bumped whenever the way results are computed changes, so stored results are recomputed
+RESULTS_VERSION = 3
+
+
+class AnalysisCache:
+    # Persistent store of extracted page text and keyword results, keyed by PDF content hash
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT);
+            CREATE TABLE IF NOT EXISTS aliases (
+                hash TEXT PRIMARY KEY, canonical TEXT);
+            CREATE TABLE IF NOT EXISTS documents (
+                hash TEXT PRIMARY KEY, pages INTEGER);
+            CREATE TABLE IF NOT EXISTS pages (
+                hash TEXT, page INTEGER, text TEXT, boxes BLOB, lines BLOB, PRIMARY KEY (hash, page));
+            CREATE TABLE IF NOT EXISTS results (
+                hash TEXT, keyword TEXT, hits TEXT, PRIMARY KEY (hash, keyword));
+            CREATE TABLE IF NOT EXISTS highlights (
+                hash TEXT, keyword TEXT, PRIMARY KEY (hash, keyword));
+        """)
+
+        # Results from an older version of the analyser are dropped, extracted text is kept
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != RESULTS_VERSION:
+            self.conn.execute("DELETE FROM results")
+            self.conn.execute("DELETE FROM highlights")
+            self.conn.execute(f"PRAGMA user_version = {RESULTS_VERSION}")
+        self.conn.commit()
+
+    # Content hash of a file, reusing the last one while size and mtime are unchanged
+    def file_hash(self, path):
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+
+        row = self.conn.execute("SELECT size, mtime, hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                          (path, stat.st_size, stat.st_mtime, digest.hexdigest()))
+        self.conn.commit()
+        return digest.hexdigest()
+
+    # Hash under which a document is stored, following highlighted copies back to the original
+    def resolve(self, doc_hash):
+        row = self.conn.execute("SELECT canonical FROM aliases WHERE hash = ?", (doc_hash,)).fetchone()
+        return row[0] if row else doc_hash
+
+    # Records that a file saved with highlights has the same text as the original
+    def add_alias(self, doc_hash, canonical):
+        if doc_hash != canonical:
+            self.conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (doc_hash, canonical))
+            self.conn.commit()
+
+    # Returns (text, boxes, lines) for every page, or None if the document was never extracted
+    def load_pages(self, doc_hash):
+        if self.conn.execute("SELECT 1 FROM documents WHERE hash = ?", (doc_hash,)).fetchone() is None:
+            return None
+
+        pages = []
+        for text, boxes, lines in self.conn.execute(
+                "SELECT text, boxes, lines FROM pages WHERE hash = ? ORDER BY page", (doc_hash,)):
+            pages.append((text, array('f', zlib.decompress(boxes)), array('i', zlib.decompress(lines))))
+        return pages
+
+    def store_pages(self, doc_hash, pages):
+        self.conn.execute("DELETE FROM pages WHERE hash = ?", (doc_hash,))
+        self.conn.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?)", [
+            (doc_hash, page_num, text, zlib.compress(boxes.tobytes()), zlib.compress(lines.tobytes()))
+            for page_num, (text, boxes, lines) in enumerate(pages)])
+        self.conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)", (doc_hash, len(pages)))
+        self.conn.commit()
+
+    # Returns {keyword: [(page, context), ...]} for the keywords already analysed in this document
+    def load_results(self, doc_hash, keywords):
+        results = {}
+        for keyword in set(keywords):
+            row = self.conn.execute("SELECT hits FROM results WHERE hash = ? AND keyword = ?",
+                                    (doc_hash, keyword)).fetchone()
+            if row:
+                results[keyword] = [tuple(hit) for hit in json.loads(row[0])]
+        return results
+
+    def store_results(self, doc_hash, results):
+        self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                              [(doc_hash, keyword, json.dumps(hits)) for keyword, hits in results.items()])
+        self.conn.commit()
+
+    # Keywords whose instances are already highlighted in the file with this exact hash
+    def load_highlighted(self, file_hash):
+        return {row[0] for row in self.conn.execute("SELECT keyword FROM highlights WHERE hash = ?", (file_hash,))}
+
+    def store_highlighted(self, file_hash, keywords):
+        self.conn.executemany("INSERT OR IGNORE INTO highlights VALUES (?, ?)",
+                              [(file_hash, keyword) for keyword in keywords])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
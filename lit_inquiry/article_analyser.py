@@ -0,0 +1,626 @@
+# nltk, pandas and PyMuPDF are imported where they're used, so the CLI and pool workers start fast
+import os
+import argparse
+import re
+import tempfile
+from glob import glob
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from array import array
+from .article_io import read_articles, ResultWriter
+from .analysis_cache import AnalysisCache
+from .metadata import MetadataIndex, title_probe
+from .metrics import metrics, add_arguments as add_metrics_arguments, setup as setup_metrics, finish as finish_metrics
+
+# Characters that make a keyword a regex of its own rather than a plain word
+REGEX_CHARS = set('\\.^$*+?{}[]|()')
+
+# Keyword instances gathered before they are joined with their metadata and written out
+BATCH_ROWS = 10000
+
+
+class KeywordMatcher:
+    # Finds all keywords of a page in one pass instead of one scan per keyword
+    def __init__(self, keywords, patterns):
+        self.keywords = keywords
+        self.patterns = patterns # Compiled pattern of each keyword, same order as keywords
+
+        self.direct = [] # Citations and regex-like keywords, scanned on their own
+        self.scanned = [] # Plain and *U keywords found through the combined scan
+        self.by_first_char = {} # Scanned keywords grouped by their lowercased first character
+        self.non_ascii = [] # Scanned keywords starting with a non-ASCII letter, checked at every hit
+
+        folded, exact = [], []
+        for index, word in enumerate(keywords):
+            core = word[0:-3] if word[-2:] == '*U' else word
+            if word[-2:] == '*C' or not core or REGEX_CHARS & set(core):
+                self.direct.append(index)
+                continue
+
+            self.scanned.append(index)
+            if core[0].isascii():
+                self.by_first_char.setdefault(core[0].lower(), []).append(index)
+            else:
+                self.non_ascii.append(index)
+            (exact if word[-2:] == '*U' else folded).append(core)
+
+        # Zero-width scan that stops wherever at least one keyword starts
+        alternatives = []
+        if folded:
+            alternatives.append('(?i:' + self.trie_pattern(folded) + ')')
+        if exact:
+            alternatives.append('(?:' + self.trie_pattern(exact) + ')')
+        self.combined = re.compile('(?=' + '|'.join(alternatives) + ')') if alternatives else None
+
+    # Builds one regex from a prefix tree of words, allowing whitespace between letters
+    @staticmethod
+    def trie_pattern(words):
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node):
+            # A shorter keyword already starts here, longer ones are checked later
+            if '' in node:
+                return ''
+            branches = []
+            for char, child in sorted(node.items()):
+                rest = build(child)
+                branches.append(re.escape(char) + (r'\s*' + rest if rest else ''))
+            return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+        return build(trie)
+
+    # Returns the matches of each keyword on the page, same as pattern.finditer per keyword
+    def find(self, page_text):
+        found = [[] for _ in self.keywords]
+
+        if self.combined is not None:
+            ends = {} # End of the last match of each keyword, matches never overlap
+            for hit in self.combined.finditer(page_text):
+                start = hit.start()
+                char = page_text[start]
+
+                # Case folding can map non-ASCII letters onto ASCII keywords
+                if char.isascii():
+                    candidates = self.by_first_char.get(char.lower(), []) + self.non_ascii
+                else:
+                    candidates = self.scanned
+
+                for index in candidates:
+                    if start < ends.get(index, 0):
+                        continue
+                    match = self.patterns[index].match(page_text, start)
+                    if match:
+                        found[index].append(match)
+                        ends[index] = match.end()
+
+        for index in self.direct:
+            found[index] = list(self.patterns[index].finditer(page_text))
+
+        return found
+
+
+
+class PageText:
+    # Text of a page with the box and line of every character, so matches map straight to rects
+    def __init__(self, text, boxes, lines):
+        self.text = text
+        self.boxes = boxes # x0, y0, x1, y1 of each character, flattened
+        self.lines = lines # Line number of each character, -1 for the line breaks we add
+
+    # Extracts the page once with PyMuPDF, keeping character positions
+    @classmethod
+    def from_page(cls, pdf_page):
+        chars = []
+        boxes = array('f')
+        lines = array('i')
+
+        line_num = 0
+        for block in pdf_page.get_text("rawdict", flags=0)["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    for char in span["chars"]:
+                        chars.append(char["c"])
+                        boxes.extend(char["bbox"])
+                        lines.append(line_num)
+
+                # Line break between lines, like PyMuPDF's plain text output
+                chars.append("\n")
+                boxes.extend((0, 0, 0, 0))
+                lines.append(-1)
+                line_num += 1
+
+        return cls("".join(chars), boxes, lines)
+
+    # Rects covering text[start:end], one per line the match spans
+    def rects(self, start, end):
+        from fitz import Rect
+
+        by_line = {}
+        for i in range(start, min(end, len(self.lines))):
+            line = self.lines[i]
+            if line < 0:
+                continue
+            x0, y0, x1, y1 = self.boxes[4 * i:4 * i + 4]
+            if line in by_line:
+                by_line[line] |= Rect(x0, y0, x1, y1)
+            else:
+                by_line[line] = Rect(x0, y0, x1, y1)
+        return list(by_line.values())
+
+
+class PDFHighlighter:
+    # Initial setup
+    def __init__(self, pdf_folder, data_path, keywords_path, workers=1, cache_path=None,
+                 highlight='inplace', output_dir=None, fuzzy=True):
+        self.setup_keywords(self.load_keywords(keywords_path), cache_path, highlight, output_dir) # Load keywords
+        self.filenames = sorted(glob(os.path.join(pdf_folder, "*.pdf"))) # Get filenames, in a fixed order
+        self.workers = workers # Number of processes scanning PDFs
+        self.failed = [] # (PDF, error) of every file that could not be scanned
+        # Only the index of titles and authors is kept from the database
+        # With fuzzy, PDFs whose DOI isn't in it are matched on the title on their first page
+        self.pdf_folder = pdf_folder
+        self.metadata = MetadataIndex.from_articles(read_articles(data_path, columns=['DOI_link', 'Title', 'Authors']),
+                                                    probe=title_probe if fuzzy else None)
+
+    # Highlighter with keywords only, as built once in each pool worker
+    @classmethod
+    def for_keywords(cls, keywords, cache_path=None, highlight='inplace', output_dir=None):
+        highlighter = cls.__new__(cls)
+        highlighter.setup_keywords(keywords, cache_path, highlight, output_dir)
+        return highlighter
+
+    # Tokenizer, compiled keyword patterns, the store of earlier results and highlight settings
+    def setup_keywords(self, keywords, cache_path=None, highlight='inplace', output_dir=None):
+        self.tokenizer = None # Tokenizer for context, loaded once a page has matches
+        self.keywords = keywords
+        self.matcher = KeywordMatcher(keywords, [self.create_pattern(word) for word in keywords]) # Compile keywords once
+        self.matchers = {} # Matchers for keywords missing from the cache
+        self.cache_path = cache_path
+        self.cache = AnalysisCache(cache_path) if cache_path else None # Extracted text and results by PDF hash
+        self.highlight = highlight # 'inplace', 'copy' to write highlighted PDFs to output_dir, or 'none'
+        self.output_dir = output_dir
+
+    # Loads keywords given the txt file
+    @staticmethod
+    def load_keywords(path):
+        with open(path, 'r') as file:
+            return [line.strip() for line in file]
+
+    # Creates regex pattern given the symbol in the txt file
+    def create_pattern(self, word):
+        # Citation handling
+        if word[-2:] == '*C':
+            authors, year = re.match(r'^(.*?)(\(\d{4}\)|\d{4})$', \
+            word.split(' / ')[0]).groups()
+
+            authors = [re.escape(author.strip()) for author in authors.split(',')]
+
+            title = word[:-3].split(' / ')[1].replace(" ", "\s*")
+
+            pattern = re.compile(fr'\(?\b(?:{"|".join(authors)})(?:, \
+                *\b(?:{"|".join(authors)}))*\s*[,-]?\s*{year}\)?|{title}',\
+                re.IGNORECASE | re.MULTILINE)
+          
+        # Upper case handling
+        elif word[-2:] == '*U':
+            pattern = re.compile(r'\s*'.join(word[0:-3]) \
+                + r'(s|es|ies)?\b', re.MULTILINE)
+        
+        # Regular keywords, handling only plural
+        else:
+            pattern = re.compile(r'\s*'.join(word) + r'(s|es|ies)?\b',\
+                re.IGNORECASE | re.MULTILINE)
+            
+        return pattern
+
+    # Compiled matcher for a subset of the keywords, built once per subset
+    def matcher_for(self, keywords):
+        if keywords == self.keywords:
+            return self.matcher
+
+        key = tuple(keywords)
+        if key not in self.matchers:
+            self.matchers[key] = KeywordMatcher(keywords, [self.create_pattern(word) for word in keywords])
+        return self.matchers[key]
+
+    # Sentence boundaries of a page, found once for all of its matches
+    def sentence_spans(self, page_text):
+        if self.tokenizer is None:
+            import nltk.data
+            self.tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+
+        spans = list(self.tokenizer.span_tokenize(page_text))
+        return [start for start, _ in spans], spans
+
+    # Sentence containing the start of a match, looked up in the page's sentence spans
+    def match_context(self, page_text, match, sentences):
+        starts, spans = sentences
+        i = bisect_right(starts, match.start()) - 1
+
+        # A match starting between two sentences belongs to the next one
+        if i < 0 or match.start() >= spans[i][1]:
+            i += 1
+        if i >= len(spans):
+            return 'Context not accessible'
+
+        start, end = spans[i]
+        return page_text[start:end]
+
+    # Scans a PDF for the given keywords, opening it read-only
+    # Returns {keyword: [(page, context), ...]} and {keyword: {(page index, start, end): rects}}
+    def scan(self, doc, keywords, doc_hash=None):
+        from fitz import open as fitz_open
+
+        matcher = self.matcher_for(keywords)
+
+        # Reuse the text extracted by an earlier run when we have it
+        cached_pages = None
+        if self.cache:
+            with metrics.timer('load_cached_text'):
+                cached_pages = self.cache.load_pages(doc_hash)
+        if cached_pages is None:
+            with metrics.timer('extract_text'):
+                pdf_document = fitz_open(doc)
+                pages = [PageText.from_page(pdf_page) for pdf_page in pdf_document]
+                pdf_document.close()
+            metrics.count('pages_parsed', len(pages))
+            if self.cache:
+                self.cache.store_pages(doc_hash, [(page.text, page.boxes, page.lines) for page in pages])
+        else:
+            pages = [PageText(*page) for page in cached_pages]
+            metrics.count('pages_from_cache', len(pages))
+
+        hits = {word: [] for word in keywords}
+        spans = {word: {} for word in keywords}
+
+        # Loops over pages to search for words
+        for page_num, page in enumerate(pages):
+
+            # Find every keyword on the page in one pass
+            with metrics.timer('match'):
+                page_matches = matcher.find(page.text)
+            if not any(page_matches):
+                continue
+
+            # Sentences of the page, split only if something matched
+            with metrics.timer('tokenize'):
+                sentences = self.sentence_spans(page.text)
+
+            for word, matches in zip(keywords, page_matches):
+                metrics.count('matches', len(matches))
+                for match in matches:
+                    hits[word].append((page_num + 1, self.match_context(page.text, match, sentences)))
+
+                    # Rects of the matched span, from the positions of its characters
+                    if self.highlight != 'none':
+                        with metrics.timer('rects'):
+                            spans[word][(page_num,) + match.span()] = page.rects(*match.span())
+
+        return hits, spans
+
+    # File new highlights are added to, and the file they end up in
+    def highlight_paths(self, doc):
+        if self.highlight == 'copy':
+            target = os.path.join(self.output_dir, os.path.basename(doc))
+            return (target if os.path.exists(target) else doc), target
+        return doc, doc
+
+    # Adds the highlights of each page as one annotation and saves the PDF once
+    # Returns whether anything was written
+    def write_highlights(self, base, target, spans):
+        from fitz import open as fitz_open
+
+        page_rects = {}
+        for (page_num, _, _), rects in sorted(spans.items()):
+            if rects:
+                page_rects.setdefault(page_num, []).extend(rects)
+
+        if not page_rects:
+            return False
+
+        with metrics.timer('annotate'):
+            pdf_document = fitz_open(base)
+            for page_num, rects in page_rects.items():
+                pdf_document[page_num].add_highlight_annot(rects)
+        metrics.count('annotations', len(page_rects))
+
+        # Save the changes to the PDF file, or to a highlighted copy of it
+        with metrics.timer('save'):
+            temp_path = None
+            try:
+                if base != target:
+                    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+                    pdf_document.save(target)
+                elif pdf_document.can_save_incrementally():
+                    pdf_document.saveIncr()
+                else:
+                    # Files MuPDF had to repair can't be appended to, so a full copy replaces them
+                    fd, temp_path = tempfile.mkstemp(suffix='.pdf', dir=os.path.dirname(target) or '.')
+                    os.close(fd)
+                    pdf_document.save(temp_path)
+            except Exception:
+                if temp_path:
+                    os.remove(temp_path)
+                raise
+            finally:
+                pdf_document.close()
+            if temp_path:
+                os.replace(temp_path, target)
+        metrics.count('pdfs_saved')
+        return True
+
+    # Highlights keywords and outputs recorded info about instances
+    def highlighter(self, doc):
+        keywords = list(dict.fromkeys(self.keywords))
+        base, target = self.highlight_paths(doc)
+        hits = {}
+        doc_hash = None
+        highlighted = set() # Keywords the file we write to already shows
+
+        # Results of keywords analysed in an earlier run are reused as is
+        if self.cache:
+            with metrics.timer('hash'):
+                doc_hash = self.cache.resolve(self.cache.file_hash(doc))
+            hits = self.cache.load_results(doc_hash, keywords)
+            if self.highlight != 'none':
+                with metrics.timer('hash'):
+                    base_hash = self.cache.file_hash(base)
+                highlighted = self.cache.load_highlighted(base_hash)
+
+        # Keywords still to analyse, and keywords with instances that still have to be highlighted
+        to_highlight = [] if self.highlight == 'none' else \
+            [word for word in keywords if word not in highlighted and hits.get(word, True)]
+        to_scan = [word for word in keywords if word not in hits or word in to_highlight]
+
+        if to_scan:
+            new_hits, spans = self.scan(doc, to_scan, doc_hash)
+            if self.cache:
+                self.cache.store_results(doc_hash, {word: new_hits[word] for word in to_scan if word not in hits})
+            hits.update(new_hits)
+
+            # Each matched span is highlighted once, whichever keywords matched it
+            page_spans = {}
+            for word in to_highlight:
+                page_spans.update(spans[word])
+
+            # A PDF that can't be highlighted still gets its rows, and is highlighted again next run
+            try:
+                saved = self.write_highlights(base, target, page_spans)
+            except Exception as e:
+                print(f"Highlighting {os.path.basename(doc)} ... failed! ({type(e).__name__}: {e})")
+                metrics.count('highlight_failures')
+                saved = False
+
+            if saved and self.cache:
+                # The highlighted file hashes differently but has the same text
+                with metrics.timer('hash'):
+                    target_hash = self.cache.file_hash(target)
+                self.cache.add_alias(target_hash, doc_hash)
+                self.cache.store_highlighted(target_hash, highlighted | set(to_highlight))
+
+        # Instances ordered by page, then keyword, then position on the page
+        instances = sorted(((page, index, context) for index, word in enumerate(self.keywords)
+                            for page, context in hits[word]), key=lambda instance: instance[:2])
+
+        DOIs = [os.path.basename(doc)[:-4]] * len(instances)
+        instance_pages = [page for page, _, _ in instances]
+        key_values = [self.keywords[index] for _, index, _ in instances]
+        context = [sentence for _, _, sentence in instances]
+
+        # If no instances found for a word, set default
+        found = set(key_values)
+        for word in self.keywords:
+            if word not in found:
+                found.add(word)
+                instance_pages.append(0)
+                DOIs.append(os.path.basename(doc)[:-4])
+                key_values.append(word)
+                context.append("NA")
+
+        # Returns DOIs, instances, and words
+        return [DOIs, instance_pages, key_values, context]
+
+    # Formats record info given from highlighter function
+    def format_record(self, pdf):
+        import pandas as pd
+
+        record = self.highlighter(pdf)
+
+        DOIs = record[0]
+        pages = record[1]
+        key_values = record[2]
+        context = record[3]
+
+        return pd.DataFrame({'DOIs': DOIs, 'key_values' : key_values,\
+                'Pages' : pages, 'Context' : context})
+
+    # Runs the highlighter on one PDF, returning the error instead of raising it
+    # Also returns the document's timings and counts, see Metrics.document
+    def safe_record(self, pdf):
+        record, error = None, None
+        with metrics.document() as stats:
+            metrics.count('documents')
+            try:
+                record = self.highlighter(pdf)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        return record, error, stats
+
+    # Yields (pdf, record, error, stats) for every PDF file, in filename order
+    def iter_records(self):
+        if self.workers > 1:
+            remaining = deque(self.filenames)
+            while remaining:
+                crashed = yield from self.iter_pool(remaining, self.workers)
+
+                # A worker died, as when MuPDF segfaults on a malformed file: the PDFs it may have been
+                # scanning are tried again each in a pool of its own, so only the culprit fails
+                for pdf in crashed:
+                    if (yield from self.iter_pool(deque([pdf]), 1)):
+                        yield pdf, None, "BrokenProcessPool: the worker process scanning it died", \
+                            {'seconds': 0.0, 'stages': {}, 'counters': {'documents': 1, 'worker_crashes': 1}}
+        else:
+            for pdf in self.filenames:
+                yield (pdf,) + self.safe_record(pdf)
+
+    # Scans the PDFs of a deque in a process pool, taking them off it as they are handed out
+    # Returns the PDFs that were in flight if a worker process died, in filename order
+    def iter_pool(self, filenames, workers):
+        with ProcessPoolExecutor(workers, initializer=init_worker,
+                                 initargs=(self.keywords, self.cache_path, self.highlight, self.output_dir,
+                                           metrics.profiles is not None)) as executor:
+            # Only a few PDFs per worker are handed out ahead, so finished records never pile up
+            pending = deque()
+            while filenames or pending:
+                try:
+                    if filenames and len(pending) < 4 * workers:
+                        pending.append((filenames[0], executor.submit(process_pdf, filenames[0])))
+                        filenames.popleft()
+                        continue
+                    result = pending[0][1].result()
+                except BrokenProcessPool:
+                    return [pdf for pdf, _ in pending]
+                pending.popleft()
+                yield result
+        return []
+
+    # Yields (pdf, record) of every PDF that could be scanned, reporting progress and failures
+    def iter_documents(self):
+        total_files = len(self.filenames)
+
+        for id, (pdf, record, error, stats) in enumerate(self.iter_records()):
+            metrics.add_document(os.path.basename(pdf), stats)
+            if error:
+                print(f"Scraping {id + 1}/{total_files}: {os.path.basename(pdf)} ... failed! ({error})")
+                self.failed.append((pdf, error))
+                continue
+
+            print(f"Scraping {id + 1}/{total_files}: {os.path.basename(pdf)} ... done!")
+            yield pdf, record
+
+        if self.failed:
+            print(f"{len(self.failed)} of {total_files} files could not be scanned:")
+            for pdf, error in self.failed:
+                print(f"  {pdf}: {error}")
+
+    # Yields the keyword instances of all PDFs as dataframes of about batch_rows rows, with their metadata
+    def iter_batches(self, batch_rows=BATCH_ROWS):
+        columns = {'DOIs': [], 'key_values': [], 'Pages': [], 'Context': []}
+        batches = 0
+
+        for _, (DOIs, pages, key_values, context) in self.iter_documents():
+            columns['DOIs'].extend(DOIs)
+            columns['key_values'].extend(key_values)
+            columns['Pages'].extend(pages)
+            columns['Context'].extend(context)
+
+            if len(columns['DOIs']) >= batch_rows:
+                yield self.add_metadata(self.batch_df(columns))
+                columns = {column: [] for column in columns}
+                batches += 1
+
+        # The last rows, or an empty dataframe with the output's columns when no document had any,
+        # which ResultWriter writes as a file with just the header
+        if columns['DOIs'] or not batches:
+            yield self.add_metadata(self.batch_df(columns))
+
+    @staticmethod
+    def batch_df(columns):
+        import pandas as pd
+
+        # Without rows pandas can't tell the types, and Context must stay text
+        df = pd.DataFrame(columns) if columns['DOIs'] else \
+            pd.DataFrame(columns, dtype=object).astype({'Pages': 'int64'})
+        df.Context = df.Context.str.replace("\n", "")
+        return df
+
+    # Runs the highlighter on all the PDF files and outputs final dataframe
+    # Holds every row in memory, write_results streams them to a file instead
+    def final_df(self):
+        import pandas as pd
+
+        return pd.concat(list(self.iter_batches()), ignore_index=True)
+
+    # Appends the keyword instances to a CSV or Parquet file in batches, returning the rows written
+    def write_results(self, path, batch_rows=BATCH_ROWS):
+        with ResultWriter(path) as writer:
+            for df in self.iter_batches(batch_rows):
+                writer.write(df)
+        return writer.rows
+
+    # Adds additional information to the dataframe
+    def add_metadata(self, df):
+        # Each document of the batch is looked up once
+        found = {doi: self.metadata.lookup(doi, os.path.join(self.pdf_folder, doi + '.pdf'))
+                 for doi in df['DOIs'].unique()}
+
+        # Create metadata columns
+        df['title'] = df['DOIs'].map({doi: title for doi, (title, _) in found.items()})
+        df['author'] = df['DOIs'].map({doi: authors for doi, (_, authors) in found.items()})
+        # df['year_pub'] = df['title'].map(self.df_ref.groupby('Title')['year_pub'].first())
+        # df['month_pub'] = df['title'].map(self.df_ref.groupby('Title')['month_pub'].first())
+
+        return df
+
+# Highlighter of each pool worker, built once by init_worker
+worker_highlighter = None
+
+def init_worker(keywords, cache_path=None, highlight='inplace', output_dir=None, profile=False):
+    global worker_highlighter
+    if profile:
+        metrics.enable_profiling()
+    worker_highlighter = PDFHighlighter.for_keywords(keywords, cache_path, highlight, output_dir)
+
+def process_pdf(pdf):
+    return (pdf,) + worker_highlighter.safe_record(pdf)
+
+# Command call for directory and files
+def parse_args():
+    parser = argparse.ArgumentParser(description='PDF Highlighter')
+    parser.add_argument('-k', '--keywords', type=str, default='./keywords.txt',
+                        help='Path to keywords file')
+    parser.add_argument('-a', '--articledb', type=str, default='./all_articles.dta',
+                        help='Path to articles database')
+    parser.add_argument('-f', '--pdf_folder', type=str, default='./all_pdfs',
+                        help='Path to pdfs folder (default: current directory)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of processes scanning PDFs in parallel')
+    parser.add_argument('--highlight', type=str, default='inplace', choices=['inplace', 'copy', 'none'],
+                        help="Highlight matches in the PDFs themselves, in copies saved to --output_dir, or not at all")
+    parser.add_argument('--output_dir', type=str, default='./highlighted_pdfs',
+                        help="Folder for highlighted copies when using --highlight copy")
+    parser.add_argument('--cache', type=str, default='./analysis_cache.sqlite',
+                        help='Store of extracted text and results, so reruns only scan new PDFs and keywords')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Extract and scan every PDF again without using the cache')
+    parser.add_argument('-o', '--output', type=str, default='key_words_freq.csv',
+                        help='Output file, written as Parquet for .parquet paths and CSV otherwise')
+    parser.add_argument('--batch_rows', type=int, default=BATCH_ROWS,
+                        help='Rows gathered before they are written to the output')
+    parser.add_argument('--no_fuzzy', action='store_true',
+                        help='Only match PDFs to the articles database by DOI, not by the title on their first page')
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+# Usage
+def main():
+    args = parse_args()
+    setup_metrics(args)
+
+    pdf_highlighter = PDFHighlighter(args.pdf_folder, args.articledb, args.keywords, args.workers,
+                                     None if args.no_cache else args.cache, args.highlight, args.output_dir,
+                                     not args.no_fuzzy)
+
+    rows = pdf_highlighter.write_results(args.output, args.batch_rows)
+    print(f"Wrote {rows} rows to {args.output}")
+    finish_metrics(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+# Setup
+# requests and selenium are imported where they're used, so the CLI starts fast and Chrome is only set up when needed
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+from .article_io import read_articles
+from .http_utils import make_session, HostRateLimiter
+from .download_manifest import DownloadManifest
+from .metrics import metrics, add_arguments as add_metrics_arguments, setup as setup_metrics, finish as finish_metrics
+
+# Where the PDF of an AEA DOI is served
+PDF_URL = "https://pubs.aeaweb.org/doi/pdfplus/{doi}"
+
+# Size of the chunks streamed to disk
+CHUNK_SIZE = 64 * 1024
+
+# Command call for directory and files
+def parse_args():
+    parser = argparse.ArgumentParser(description='PDF Downloader')
+    parser.add_argument('-a', '--articledb', type=str, default='./all_articles.dta',
+                        help='Path to articles database')
+    parser.add_argument('-f', '--folder', type=str, default='./all_pdfs',
+                        help='Directory where PDFs will be downloaded')
+    parser.add_argument('-w', '--workers', type=int, default=8,
+                        help='Number of PDFs downloaded at the same time over HTTP')
+    parser.add_argument('--url_template', type=str, default=PDF_URL,
+                        help='URL of the PDF of a DOI, with {doi} in place of the DOI')
+    parser.add_argument('--browser_hosts', type=str, default='',
+                        help='Comma-separated hosts that are only downloaded through the browser')
+    parser.add_argument('--browser_workers', type=int, default=2,
+                        help='Number of headless browsers downloading at the same time')
+    parser.add_argument('--no_browser', action='store_true',
+                        help='Never fall back to the browser, report those PDFs as failed instead')
+    parser.add_argument('-r', '--rate', type=float, default=2.0,
+                        help='Maximum requests per second to any one host (0 for no limit)')
+    parser.add_argument('--manifest', type=str, default='./download_manifest.sqlite',
+                        help='Path to the record of downloaded and failed DOIs')
+    parser.add_argument('--max_attempts', type=int, default=5,
+                        help='Failed attempts after which a DOI is no longer retried')
+    parser.add_argument('--retry_failed', action='store_true',
+                        help='Retry every failed DOI now, ignoring backoff and --max_attempts')
+    parser.add_argument('--no_manifest', action='store_true',
+                        help='Do not record downloads, only skip PDFs already in the folder')
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+
+# URL of the PDF of a DOI, or the DOI itself when it already is a URL
+def pdf_url(doi, url_template=PDF_URL):
+    return url_template.format(doi=doi) if 'https://' not in doi else doi
+
+# Where the PDF of a DOI is saved in folder_path
+def pdf_path(folder_path, doi):
+    return os.path.join(folder_path, doi.replace('/', '_') + '.pdf')
+
+
+class HTTPDownloader:
+    # Downloads PDFs straight over HTTP with a pooled session, a few at a time
+    def __init__(self, folder_path, workers=8, url_template=PDF_URL, browser_hosts=(), timeout=60,
+                 rate_limiter=None, retries=2, backoff=2.0):
+        self.folder_path = folder_path
+        self.workers = workers
+        self.url_template = url_template
+        self.browser_hosts = set(browser_hosts) # Hosts that need a real browser
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter # HostRateLimiter shared by all workers
+        self.retries = retries # Extra attempts after a transient error
+        self.backoff = backoff # Seconds before the first extra attempt, doubled after each one
+        self.session = make_session(workers)
+
+    def pdf_url(self, doi):
+        return pdf_url(doi, self.url_template)
+
+    def file_path(self, doi):
+        return pdf_path(self.folder_path, doi)
+
+    # Streams one PDF to disk, returning (doi, status, detail)
+    # status is 'ok', 'browser' when the host didn't serve a PDF, or 'failed'
+    def download(self, doi):
+        url = self.pdf_url(doi)
+        if urlparse(url).hostname in self.browser_hosts:
+            return doi, 'browser', 'host needs a browser'
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                metrics.count('http_retries')
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            if self.rate_limiter:
+                with metrics.timer('rate_limit_wait'):
+                    self.rate_limiter.wait(url)
+
+            with metrics.timer('http_download'):
+                status, detail, transient = self.fetch(url, self.file_path(doi))
+            metrics.count('pdf_requests')
+            if not transient:
+                break
+
+        metrics.count(f"http_downloads_{status}")
+        return doi, status, detail
+
+    # One attempt at a download, returning (status, detail, transient)
+    # Timeouts, dropped connections and overloaded servers are transient and worth another try
+    def fetch(self, url, path):
+        import requests
+
+        part_path = path + '.part'
+
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                # Missing files won't show up in a browser either, anything else may need one
+                if response.status_code in (404, 410):
+                    return 'failed', f"HTTP {response.status_code}", False
+                if response.status_code != 200:
+                    transient = response.status_code == 429 or response.status_code >= 500
+                    return 'browser', f"HTTP {response.status_code}", transient
+
+                expected = int(response.headers.get('Content-Length') or 0)
+                size = 0
+
+                with open(part_path, 'wb') as file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        # Landing and paywall pages come back as HTML instead of a PDF
+                        if size == 0 and b'%PDF' not in chunk[:1024]:
+                            file.close()
+                            os.remove(part_path)
+                            return 'browser', f"not a PDF ({response.headers.get('Content-Type')})", False
+                        file.write(chunk)
+                        size += len(chunk)
+
+                # Content-Length counts the bytes on the wire, which are compressed under a Content-Encoding
+                received = response.raw.tell()
+
+        except requests.RequestException as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return 'failed', f"{type(e).__name__}: {e}", True
+        except OSError as e:
+            # The file couldn't be written, another try won't help
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return 'failed', f"{type(e).__name__}: {e}", False
+
+        if size == 0 or (expected and received != expected):
+            os.remove(part_path)
+            return 'failed', f"got {received} of {expected} bytes", True
+
+        # Only complete PDFs ever get their final name
+        os.replace(part_path, path)
+        metrics.count('bytes_downloaded', size)
+        return 'ok', f"{size} bytes", False
+
+    # Downloads all DOIs concurrently, yielding results as they finish
+    def download_all(self, dois):
+        os.makedirs(self.folder_path, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(metrics.profiled(self.download, 'download'), doi) for doi in dois]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+# Waits until a finished file shows up in a download directory and its size settles
+# Returns its path, or None on timeout
+def wait_for_download(directory, timeout=120, interval=0.25):
+    deadline = time.monotonic() + timeout
+    last_seen = None
+
+    while time.monotonic() < deadline:
+        names = [name for name in os.listdir(directory) if not name.startswith('.')]
+        in_progress = any(name.endswith(('.crdownload', '.tmp')) for name in names)
+
+        if names and not in_progress:
+            path = os.path.join(directory, names[0])
+            seen = (path, os.path.getsize(path))
+            if seen == last_seen and seen[1] > 0:
+                return path
+            last_seen = seen
+
+        time.sleep(interval)
+
+    return None
+
+
+class BrowserPool:
+    # Headless Chrome workers for hosts that don't serve PDFs directly, each with its own download directory
+    def __init__(self, folder_path, workers=2, url_template=PDF_URL, timeout=120, rate_limiter=None):
+        self.folder_path = os.path.abspath(folder_path)
+        self.workers = workers
+        self.url_template = url_template
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter # HostRateLimiter, shared with the HTTP downloads
+        self.local = threading.local() # Driver and download directory of each worker thread
+        self.started = [] # (driver, download directory) of every worker, to clean up
+        self.lock = threading.Lock()
+
+    def start_driver(self, download_dir):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        # Browser options
+        browser_options = ChromeOptions()
+        browser_options.add_argument("--headless=new")
+        browser_options.add_experimental_option('prefs', {
+            "download.default_directory": download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "plugins.always_open_pdf_externally": True
+        })
+        service = ChromeService(ChromeDriverManager().install())
+        return webdriver.Chrome(service=service, options=browser_options)
+
+    # The calling thread's driver, started on first use
+    def worker(self):
+        if not hasattr(self.local, 'driver'):
+            # Inside the target folder, so finished files can be moved atomically
+            self.local.download_dir = tempfile.mkdtemp(prefix='.browser-', dir=self.folder_path)
+            with metrics.timer('browser_start'):
+                self.local.driver = self.start_driver(self.local.download_dir)
+            with self.lock:
+                self.started.append((self.local.driver, self.local.download_dir))
+        return self.local.driver, self.local.download_dir
+
+    # Downloads one DOI in the calling worker's browser, returning (doi, status, detail)
+    def download(self, doi):
+        from selenium.common.exceptions import WebDriverException
+
+        # A page that fails to load, times out or crashes the browser only fails its own DOI
+        try:
+            driver, download_dir = self.worker()
+        except Exception as e: # webdriver_manager and Chrome can fail to start in many ways
+            status, detail = 'failed', f"browser did not start: {type(e).__name__}: {e}"
+        else:
+            try:
+                doi, status, detail = self.fetch(doi, driver, download_dir)
+            except WebDriverException as e:
+                # The session may be dead, so the next DOI of this worker gets a fresh browser
+                status, detail = 'failed', f"{type(e).__name__}: {e}"
+                self.restart()
+            except OSError as e:
+                status, detail = 'failed', f"{type(e).__name__}: {e}"
+        metrics.count(f"browser_downloads_{status}")
+        return doi, status, detail
+
+    # Quits the calling thread's browser, so that worker() starts a new one
+    def restart(self):
+        driver, download_dir = self.local.driver, self.local.download_dir
+        del self.local.driver, self.local.download_dir
+        with self.lock:
+            self.started.remove((driver, download_dir))
+        try:
+            driver.quit()
+        except Exception: # A crashed browser may not answer anymore
+            pass
+        shutil.rmtree(download_dir, ignore_errors=True)
+        metrics.count('browser_restarts')
+
+    # One download in the given browser, saved to the target folder once complete
+    def fetch(self, doi, driver, download_dir):
+        download_url = pdf_url(doi, self.url_template)
+
+        # Leftovers of an earlier failed download must not be taken for this one
+        for name in os.listdir(download_dir):
+            os.remove(os.path.join(download_dir, name))
+
+        if self.rate_limiter:
+            with metrics.timer('rate_limit_wait'):
+                self.rate_limiter.wait(download_url)
+        with metrics.timer('browser_load'):
+            driver.get(download_url)
+        with metrics.timer('browser_wait'):
+            path = wait_for_download(download_dir, self.timeout)
+        if path is None:
+            return doi, 'failed', f"no download within {self.timeout}s"
+
+        with open(path, 'rb') as file:
+            if b'%PDF' not in file.read(1024):
+                os.remove(path)
+                return doi, 'failed', "browser download is not a PDF"
+
+        size = os.path.getsize(path)
+        os.replace(path, pdf_path(self.folder_path, doi))
+        metrics.count('bytes_downloaded', size)
+        return doi, 'ok', f"{size} bytes"
+
+    # Downloads all DOIs over the pool of browsers, yielding results as they finish
+    def download_all(self, dois):
+        os.makedirs(self.folder_path, exist_ok=True)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(metrics.profiled(self.download, 'browser'), doi) for doi in dois]
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            self.close()
+
+    # Quits every browser and removes its download directory
+    def close(self):
+        with self.lock:
+            for driver, download_dir in self.started:
+                try:
+                    driver.quit()
+                except Exception: # A crashed browser may not answer anymore
+                    pass
+                shutil.rmtree(download_dir, ignore_errors=True)
+            self.started = []
+
+# DOIs of the AEA articles in df, each once, in order
+def aea_dois(df):
+    aea_df = df[(df['Publisher'] == 'American Economic *') & df['DOI_link'].notna()]
+    return list(dict.fromkeys(aea_df['DOI_link']))
+
+class Downloader:
+    # Downloads PDFs over HTTP first and through the browser only for what HTTP couldn't get
+    def __init__(self, folder_path, workers=8, url_template=PDF_URL, browser_hosts=(), use_browser=True,
+                 browser_workers=2, manifest=None, rate=None):
+        self.folder_path = folder_path
+        self.url_template = url_template
+        self.use_browser = use_browser
+        self.browser_workers = browser_workers
+        self.manifest = manifest # DownloadManifest recording every outcome, or None
+        self.rate_limiter = HostRateLimiter(rate) # Shared by the HTTP downloads and the browsers
+        self.http = HTTPDownloader(folder_path, workers, url_template, browser_hosts, rate_limiter=self.rate_limiter)
+
+    # DOIs still to download: PDFs already on disk and failures still backing off are left alone
+    def plan(self, dois, retry_failed=False):
+        if self.manifest:
+            dois, skipped = self.manifest.plan(dois, self.folder_path, retry_failed)
+            print(f"Skipping {skipped['done']} downloaded PDFs, {skipped['waiting']} failures waiting to be retried "
+                  f"and {skipped['gave up']} given up on")
+            return dois
+        return [doi for doi in dois if not os.path.exists(self.http.file_path(doi))]
+
+    # Final outcome of a DOI, recorded as soon as it's known so an interrupted run loses nothing
+    def finish(self, doi, status, detail):
+        if self.manifest and status == 'ok':
+            self.manifest.mark_ok(doi, self.http.file_path(doi))
+        elif self.manifest:
+            self.manifest.mark_failed(doi, detail)
+
+    def download(self, dois, retry_failed=False):
+        """
+        Downloads the PDFs of the DOIs into the folder.
+
+        Parameters:
+        - dois (list): DOIs to download. Those already downloaded are skipped.
+        - retry_failed (bool, optional): Retry failed DOIs now, ignoring the manifest's backoff. Defaults to False.
+
+        Returns:
+        - list: (doi, status, detail) of every DOI downloaded or attempted, status being 'ok' or 'failed'.
+        """
+        dois = self.plan(dois, retry_failed)
+        results = []
+        needs_browser = []
+
+        for id, (doi, status, detail) in enumerate(self.http.download_all(dois)):
+            print(f"Downloading {id + 1}/{len(dois)}: {doi} ... {status} ({detail})")
+            if status == 'browser' and self.use_browser:
+                needs_browser.append(doi)
+                continue
+            if status == 'browser':
+                status = 'failed'
+            self.finish(doi, status, detail)
+            results.append((doi, status, detail))
+
+        if needs_browser:
+            print(f"Falling back to the browser for {len(needs_browser)} PDFs")
+            browsers = BrowserPool(self.folder_path, self.browser_workers, self.url_template,
+                                   rate_limiter=self.rate_limiter)
+            for id, (doi, status, detail) in enumerate(browsers.download_all(needs_browser)):
+                print(f"Browser download {id + 1}/{len(needs_browser)}: {doi} ... {status} ({detail})")
+                self.finish(doi, status, detail)
+                results.append((doi, status, detail))
+
+        return results
+
+
+# Download file give df
+def download_pdfs(df, folder_path, workers=8, url_template=PDF_URL, browser_hosts=(), use_browser=True,
+                  browser_workers=2, manifest=None, rate=None, retry_failed=False):
+    downloader = Downloader(folder_path, workers, url_template, browser_hosts, use_browser, browser_workers,
+                            manifest, rate)
+    results = downloader.download(aea_dois(df), retry_failed)
+
+    failed = [(doi, detail) for doi, status, detail in results if status != 'ok']
+    if failed:
+        print(f"{len(failed)} PDFs could not be downloaded:")
+        for doi, detail in failed:
+            print(f"  {doi}: {detail}")
+    return results
+
+# Usage
+def main():
+    args = parse_args()
+    setup_metrics(args)
+
+    df = read_articles(args.articledb, columns=['Publisher', 'DOI_link'])
+    browser_hosts = [host.strip() for host in args.browser_hosts.split(',') if host.strip()]
+    manifest = None if args.no_manifest else DownloadManifest(args.manifest, args.max_attempts)
+    download_pdfs(df, args.folder, args.workers, args.url_template, browser_hosts, not args.no_browser,
+                  args.browser_workers, manifest, args.rate or None, args.retry_failed)
+
+    if manifest:
+        print("Manifest:", ", ".join(f"{count} {status}" for status, count in manifest.summary().items()))
+        manifest.close()
+    finish_metrics(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+
+# Columns of the search output that hold numbers
+NUMERIC_COLUMNS = ['Total Citations', 'Versions Total']
+
+
+# Parquet for .parquet/.pq paths, CSV for everything else
+def is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+# None, NaN and the "NA" that search.py fills empty cells with
+def is_missing(value):
+    import pandas as pd
+
+    return value in ("NA", "") if isinstance(value, str) else bool(pd.isna(value))
+
+
+# Loads an article table, reading only the needed columns when given
+# dtype=str keeps long IDs from being read as numbers
+# The "NA" that search.py fills empty cells with is read as missing from both formats
+def read_articles(path, columns=None, dtype=None):
+    import pandas as pd
+
+    if is_parquet(path):
+        df = pd.read_parquet(path, columns=columns)
+        for column in df.columns:
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = df[column].mask(df[column] == "NA")
+        return df.astype(dtype) if dtype else df
+    return pd.read_csv(path, usecols=columns, dtype=dtype)
+
+
+class ResultWriter:
+    # Appends batches of rows to a CSV or Parquet file as they arrive
+    def __init__(self, path, numeric_columns=()):
+        self.path = path
+        self.parquet = is_parquet(path)
+        self.numeric_columns = numeric_columns # Written as floats so every Parquet batch has the same schema
+        self.columns = None # Set by the first batch, later batches are aligned to it
+        self.writer = None
+        self.rows = 0
+        self.empty = None # First empty batch, written as a file with just the columns if no rows follow
+
+    def write(self, df):
+        if df.empty:
+            if self.empty is None:
+                self.empty = df
+            return
+
+        if self.columns is None:
+            self.columns = list(df.columns)
+        else:
+            df = df.reindex(columns=self.columns)
+
+        if self.parquet:
+            self.write_parquet(df)
+        else:
+            df.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+
+        self.rows += len(df)
+
+    def write_parquet(self, df):
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Mixed "NA"/number columns become floats, other text columns plain strings
+        df = df.copy()
+        for column in df.columns:
+            if column in self.numeric_columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+            elif not pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = df[column].astype('string')
+
+        if self.writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+
+        self.writer.write_table(table)
+
+    def close(self):
+        if not self.rows and self.empty is not None:
+            if self.parquet:
+                self.write_parquet(self.empty)
+            else:
+                self.empty.to_csv(self.path, index=False)
+            self.empty = None
+
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,197 @@
+import argparse
+import os
+import sqlite3
+from .article_io import read_articles, is_missing, ResultWriter, NUMERIC_COLUMNS
+from .http_utils import make_session, RateLimiter
+from .metrics import add_arguments as add_metrics_arguments, setup as setup_metrics, finish as finish_metrics
+from .search import iter_scholar_data, parse_years, write_batch, BATCH_SIZE
+from .serp_cache import ResponseCache
+
+
+class SeenStore:
+    # Result and Cluster IDs of the articles seen so far, in a set backed by a table on disk
+    def __init__(self, path, memory_keys=1_000_000):
+        self.memory_keys = memory_keys # Keys kept in memory before relying on the table
+        self.keys = set()
+        self.spilled = False # Whether keys were dropped from memory and may only be on disk
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM seen")
+        self.conn.commit()
+
+    # Article IDs of a search result; the Cluster ID groups the versions of one paper
+    @staticmethod
+    def article_keys(entry):
+        return [f"{kind}:{value}" for kind, value in
+                (("result", entry.get("Result ID")), ("cluster", entry.get("Cluster ID")))
+                if not is_missing(value)]
+
+    def seen(self, key):
+        if key in self.keys:
+            return True
+        return self.spilled and self.conn.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    # Marks an article as seen, returning False if any of its IDs already was
+    def add(self, entry):
+        keys = self.article_keys(entry)
+        if any(self.seen(key) for key in keys):
+            return False
+
+        if len(self.keys) + len(keys) > self.memory_keys:
+            self.conn.commit()
+            self.keys.clear()
+            self.spilled = True
+
+        self.keys.update(keys)
+        self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(key,) for key in keys])
+        return True
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class CitationCrawler:
+    # Follows the "Cited by" lists of articles breadth-first, fetching each level's lists concurrently
+    def __init__(self, api_key, year_lo, year_hi, depth=1, budget=0, store=None, test_mode=False, max_results=0,
+                 workers=4, session=None, rate_limiter=None, cache=None):
+        self.api_key = api_key
+        self.year_lo = year_lo
+        self.year_hi = year_hi
+        self.depth = depth # Levels of citing articles to follow
+        self.budget = budget # Most "Cited by" lists to fetch in total, 0 for no limit
+        self.store = store or SeenStore(":memory:")
+        self.test_mode = test_mode
+        self.max_results = max_results
+        self.workers = workers
+        self.session = session or make_session(workers)
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.expanded = 0 # "Cited by" lists fetched so far
+
+    # Marks the seed articles as seen, returning the Cites IDs of those to expand
+    def add_seeds(self, entries):
+        return [entry["Cites ID"] for entry in entries
+                if self.store.add(entry) and not is_missing(entry.get("Cites ID"))]
+
+    def crawl(self, frontier):
+        """
+        Fetches the articles citing the frontier, level by level.
+
+        Each article is yielded once, the first time it is reached, and only then is its own
+        "Cited by" list queued for the next level.
+
+        Parameters:
+        - frontier (list): Cites IDs of the articles to start from.
+
+        Yields:
+        - list: Dictionaries with the scholarly data of the new articles of one page, with
+          their depth and the Cites ID of the article they cite.
+        """
+        for depth in range(1, self.depth + 1):
+            frontier = list(dict.fromkeys(frontier))
+            if self.budget:
+                frontier = frontier[:max(0, self.budget - self.expanded)]
+            if not frontier:
+                return
+
+            print(f"Depth {depth}: fetching the citing articles of {len(frontier)} articles...")
+            self.expanded += len(frontier)
+
+            queries = [("", cites_id) for cites_id in frontier]
+            next_frontier = []
+
+            for query_id, results in iter_scholar_data(queries, self.api_key, self.year_lo, self.year_hi,
+                                                       self.test_mode, self.max_results, self.workers,
+                                                       self.session, self.rate_limiter, self.cache):
+                new = []
+                for entry in results:
+                    if not self.store.add(entry):
+                        continue
+
+                    entry["Depth"] = depth
+                    entry["Cited Article ID"] = frontier[query_id]
+                    new.append(entry)
+
+                    if entry["Cites ID"]:
+                        next_frontier.append(entry["Cites ID"])
+
+                if new:
+                    yield new
+
+            frontier = next_frontier
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Follow the citations of the articles found by search.py.")
+    parser.add_argument("-i", "--input", default="serp_articles_data.csv", help="Search results to start from (output of search.py).")
+    parser.add_argument("-a", "--api_key", help="API key for accessing the SERP API.")
+    parser.add_argument("-d", "--depth", default=1, type=int, help="Levels of citing articles to follow.")
+    parser.add_argument("-b", "--budget", default=0, type=int, help="Most \"Cited by\" lists to fetch in total (0 for no limit).")
+    parser.add_argument("-y", "--year", default="1800:2023", help="Year range for articles in format year_lo:year_hi.")
+    parser.add_argument("-t", "--test", default=0, type=int, help="Run in test mode to limit each list to two pages.")
+    parser.add_argument("-w", "--workers", default=4, type=int, help="Number of concurrent requests to the SERP API.")
+    parser.add_argument("-r", "--rate", default=5.0, type=float, help="Maximum requests per second to the SERP API (0 for no limit).")
+    parser.add_argument("-m", "--max_results", default=0, type=int, help="Skip articles cited more times than this (0 for no limit).")
+    parser.add_argument("-o", "--output", default="serp_citations_data.csv", help="Output file, written as Parquet for .parquet paths and CSV otherwise.")
+    parser.add_argument("--store", default="crawl_seen.sqlite", help="On-disk store of the articles seen during the crawl.")
+    parser.add_argument("--memory_keys", default=1_000_000, type=int, help="Article IDs kept in memory before looking them up on disk.")
+    parser.add_argument("--cache", default="serp_cache.sqlite", help="Path to the on-disk cache of SERP API responses.")
+    parser.add_argument("--no_cache", action="store_true", help="Always fetch from the SERP API and do not cache responses.")
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_metrics(args)
+
+    import pandas as pd
+
+    year_lo, year_hi = parse_years(args.year)
+    test_mode = bool(int(args.test))
+
+    seeds = read_articles(args.input, columns=["Result ID", "Cluster ID", "Cites ID"], dtype=str).astype(object)
+    seeds = seeds.where(pd.notna(seeds), None)
+
+    cache = None
+    if not args.no_cache:
+        run = ResponseCache.make_key({"crawl": os.path.abspath(args.input), "depth": args.depth, "budget": args.budget,
+                                      "year_lo": year_lo, "year_hi": year_hi, "test": test_mode,
+                                      "max_results": args.max_results})
+        cache = ResponseCache(args.cache, run=run)
+
+    store = SeenStore(args.store, args.memory_keys)
+    crawler = CitationCrawler(args.api_key, year_lo, year_hi, args.depth, args.budget, store, test_mode,
+                              args.max_results, args.workers, rate_limiter=RateLimiter(args.rate), cache=cache)
+
+    frontier = crawler.add_seeds(seeds.to_dict("records"))
+    print(f"Starting from {len(frontier)} cited articles out of {len(seeds)} search results")
+
+    total_articles = 0
+    batch = []
+    with ResultWriter(args.output, NUMERIC_COLUMNS + ["Depth"]) as writer:
+        for entries in crawler.crawl(frontier):
+            total_articles += len(entries)
+            batch.extend(entries)
+
+            if len(batch) >= BATCH_SIZE:
+                write_batch(writer, batch)
+                batch = []
+
+        write_batch(writer, batch)
+
+    if cache:
+        cache.finish_run()
+        cache.close()
+    store.close()
+
+    print("\n--- Summary ---")
+    print(f"\"Cited by\" lists fetched: {crawler.expanded}")
+    print(f"Citing articles found: {total_articles}")
+    finish_metrics(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class DownloadManifest:
+    # Persistent record of every DOI's download: status, size, checksum and failed attempts
+    def __init__(self, path, max_attempts=5, backoff=60, max_backoff=24 * 3600):
+        self.max_attempts = max_attempts # Failures after which a DOI is no longer retried
+        self.backoff = backoff # Seconds before the first retry, doubled after every failure
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS downloads (
+            doi TEXT PRIMARY KEY, status TEXT, path TEXT, bytes INTEGER, sha256 TEXT,
+            attempts INTEGER, last_error TEXT, next_attempt REAL, updated REAL)""")
+        self.conn.commit()
+
+    # Splits DOIs into the ones to download now and the ones to skip, with the reason
+    # With retry_failed, failures are retried regardless of their backoff and attempts
+    def plan(self, dois, folder_path, retry_failed=False):
+        rows = {doi: (status, attempts, next_attempt) for doi, status, attempts, next_attempt
+                in self.conn.execute("SELECT doi, status, attempts, next_attempt FROM downloads")}
+        todo = []
+        skipped = {'done': 0, 'waiting': 0, 'gave up': 0}
+
+        for doi in dois:
+            path = os.path.join(folder_path, doi.replace('/', '_') + '.pdf')
+            reason = self.skip_reason(doi, path, retry_failed, rows.get(doi, (None, 0, 0)))
+            if reason:
+                skipped[reason] += 1
+            else:
+                todo.append(doi)
+
+        return todo, skipped
+
+    # Why a DOI isn't downloaded now ('done', 'waiting' or 'gave up'), or None if it should be
+    # row is its (status, attempts, next_attempt), looked up when not given
+    def skip_reason(self, doi, path, retry_failed=False, row=None):
+        if row is None:
+            with self.lock:
+                row = self.conn.execute("SELECT status, attempts, next_attempt FROM downloads WHERE doi = ?",
+                                        (doi,)).fetchone() or (None, 0, 0)
+        status, attempts, next_attempt = row
+
+        if os.path.exists(path):
+            # PDFs downloaded before the manifest existed are recorded as they are found
+            if status != 'ok':
+                self.mark_ok(doi, path)
+            return 'done'
+        if status == 'failed' and not retry_failed and attempts >= self.max_attempts:
+            return 'gave up'
+        if status == 'failed' and not retry_failed and next_attempt > time.time():
+            return 'waiting'
+        return None
+
+    def mark_ok(self, doi, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        with self.lock:
+            self.conn.execute("""INSERT INTO downloads VALUES (?, 'ok', ?, ?, ?, 1, NULL, 0, ?)
+                ON CONFLICT (doi) DO UPDATE SET status = 'ok', path = excluded.path, bytes = excluded.bytes,
+                sha256 = excluded.sha256, attempts = attempts + 1, last_error = NULL, next_attempt = 0,
+                updated = excluded.updated""",
+                (doi, path, os.path.getsize(path), digest.hexdigest(), time.time()))
+            self.conn.commit()
+
+    # Records a failure and schedules the next attempt with exponential backoff
+    def mark_failed(self, doi, error):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT attempts FROM downloads WHERE doi = ?", (doi,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+
+            self.conn.execute("""INSERT OR REPLACE INTO downloads VALUES
+                (?, 'failed', NULL, NULL, NULL, ?, ?, ?, ?)""", (doi, attempts, error, now + delay, now))
+            self.conn.commit()
+
+    # Number of DOIs per status
+    def summary(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM downloads GROUP BY status"))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,54 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# Shared session with a connection pool large enough for every worker thread
+def make_session(pool_size=10):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RateLimiter:
+    # Spaces calls at least 1/rate seconds apart across all threads
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    # Blocks the calling thread until it is allowed to make its request
+    def wait(self):
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    # Separate RateLimiter for every host, so one slow publisher doesn't hold back the others
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    # Blocks the calling thread until it may request the URL's host
+    def wait(self, url):
+        host = urlparse(url).hostname
+        with self.lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                limiter = self.limiters[host] = RateLimiter(self.rate)
+        limiter.wait()
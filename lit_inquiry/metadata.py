@@ -0,0 +1,166 @@
+import re
+from collections import Counter
+from urllib.parse import unquote
+from .article_io import is_missing
+from .metrics import metrics
+
+# A DOI: the 10. prefix, a registrant code and a suffix, with '/' or '_' in between
+DOI_PATTERN = re.compile(r'10\.\d{4,9}[/_][^\s?#]+')
+
+# Path segments that publisher links put in front of the DOI
+LINK_PREFIXES = re.compile(r'^(?:doi|abs|pdf|pdfplus|epdf|full|reader)/')
+
+# Length of the character n-grams titles are blocked on
+NGRAM = 4
+
+
+# Key under which a DOI is indexed: the bare DOI, lowercased, with '_' read as '/'
+# Accepts DOI_link values from search.py (abs/10.3982/..., full links) and PDF names (10.1257_aer.1)
+def normalize_doi(value):
+    value = unquote(str(value)).strip().lower()
+    if value.endswith('.pdf'):
+        value = value[:-4]
+
+    match = DOI_PATTERN.search(value)
+    if match:
+        value = match.group()
+    else:
+        value = re.sub(r'^https?://[^/]+/', '', value)
+        while LINK_PREFIXES.match(value):
+            value = LINK_PREFIXES.sub('', value, count=1)
+
+    return value.rstrip('/.').replace('_', '/')
+
+
+# Lowercase letters and digits only, since PDF text breaks titles up with spaces, hyphens and line breaks
+def squash(text):
+    return re.sub(r'[\W_]+', '', str(text).lower())
+
+
+def ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+# Title and first page text of a PDF, where its title should show up
+def title_probe(path, chars=1000):
+    from fitz import open as fitz_open
+
+    try:
+        with fitz_open(path) as pdf_document:
+            parts = [pdf_document.metadata.get('title') or '']
+            if len(pdf_document):
+                parts.append(pdf_document[0].get_text()[:chars])
+    except Exception:
+        return ''
+    return ' '.join(parts)
+
+
+class MetadataIndex:
+    """
+    Title and authors of the articles found by search.py, looked up by DOI or by title.
+
+    DOIs are indexed under normalize_doi, so the name of a downloaded PDF finds its article
+    whatever form its DOI_link has. A PDF whose DOI isn't in the index is matched on the
+    title printed on its first page: titles sharing the most character n-grams with that
+    page are scored with fuzzywuzzy, so each lookup only compares a handful of titles.
+    """
+    def __init__(self, min_score=90, candidates=10, probe=title_probe):
+        self.min_score = min_score # Fuzzy score a title needs to be taken as the PDF's
+        self.candidates = candidates # Titles scored for each PDF, out of those sharing n-grams with it
+        self.probe = probe # Text of a PDF to look for titles in, None to only match on DOIs
+        self.by_doi = {} # Normalized DOI: title, the first one that isn't missing wins
+        self.authors = {} # Title: authors, the first ones that aren't missing win
+        self.titles = [] # Distinct titles, with their squashed text and number of n-grams
+        self.title_ids = {}
+        self.postings = {} # N-gram: ids of the titles containing it
+
+    @classmethod
+    def from_articles(cls, df, **options):
+        index = cls(**options)
+        index.add_articles(df)
+        return index
+
+    # Adds the DOI_link, Title and Authors columns of an article table
+    def add_articles(self, df):
+        for doi, title, authors in zip(df['DOI_link'], df['Title'], df['Authors']):
+            self.add(doi, title, authors)
+
+    def add(self, doi, title, authors=None):
+        if is_missing(title):
+            return
+        if not is_missing(doi):
+            self.by_doi.setdefault(normalize_doi(doi), title)
+        if not is_missing(authors):
+            self.authors.setdefault(title, authors)
+
+        if title not in self.title_ids:
+            title_id = len(self.titles)
+            self.title_ids[title] = title_id
+            text = squash(title)
+            grams = ngrams(text)
+            self.titles.append((title, text, len(grams)))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(title_id)
+
+    def lookup(self, doi, pdf_path=None):
+        """
+        Finds the article of a PDF.
+
+        Parameters:
+        - doi (str): DOI of the PDF, in any form normalize_doi accepts (usually its file name).
+        - pdf_path (str, optional): Path of the PDF, read for its title when its DOI isn't found.
+
+        Returns:
+        - tuple: (title, authors), with None for what isn't known.
+        """
+        title = self.by_doi.get(normalize_doi(doi))
+        if title is not None:
+            metrics.count('metadata_doi_matches')
+        elif pdf_path and self.probe and self.titles:
+            with metrics.timer('metadata_fuzzy'):
+                title = self.match_title(self.probe(pdf_path))
+            metrics.count('metadata_fuzzy_matches' if title is not None else 'metadata_unmatched')
+        else:
+            metrics.count('metadata_unmatched')
+
+        return title, self.authors.get(title)
+
+    # Title that appears in the text, or None
+    def match_title(self, text):
+        from fuzzywuzzy import fuzz
+
+        text = squash(text)
+        if not text:
+            return None
+
+        # Blocking: count the n-grams each title shares with the text, skipping the ones most titles have
+        limit = max(50, len(self.titles) // 20)
+        shared = Counter()
+        for gram in ngrams(text):
+            title_ids = self.postings.get(gram)
+            if title_ids and len(title_ids) <= limit:
+                shared.update(title_ids)
+
+        ranked = sorted(shared, key=lambda title_id: -shared[title_id] / self.titles[title_id][2])
+        best, best_score = None, 0
+        for title_id in ranked[:self.candidates]:
+            title, title_text, _ = self.titles[title_id]
+            # Short titles like "Comment" would match almost any page
+            if len(title_text) < 20:
+                continue
+
+            score = fuzz.partial_ratio(title_text, text)
+            # A little slack when an author's surname is on the page too
+            if self.author_on_page(title, text):
+                score += 5
+            if score > best_score:
+                best, best_score = title, score
+
+        return best if best_score >= self.min_score else None
+
+    def author_on_page(self, title, text):
+        authors = self.authors.get(title)
+        if authors is None:
+            return False
+        surnames = [squash(name.split()[-1]) for name in str(authors).split(',') if name.split()]
+        return any(len(surname) > 2 and surname in text for surname in surnames)
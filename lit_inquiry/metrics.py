@@ -0,0 +1,230 @@
+# cProfile and pstats are only imported once profiling is turned on
+import heapq
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Collector:
+    # Time spent in each stage and counts of the work done
+    def __init__(self):
+        self.stages = {} # stage: [seconds, calls]
+        self.counters = {}
+
+    def add_time(self, stage, seconds, calls=1):
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def add_count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return {'stages': {stage: {'seconds': round(seconds, 4), 'calls': calls}
+                           for stage, (seconds, calls) in sorted(self.stages.items())},
+                'counters': dict(sorted(self.counters.items()))}
+
+
+class RawStats:
+    # Profile data in the shape pstats.Stats loads from a profiler
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class Metrics(Collector):
+    # Timers and counters of a run; what happens inside document() is recorded for that document
+    def __init__(self, keep_documents=1000):
+        super().__init__()
+        self.lock = threading.RLock()
+        self.local = threading.local() # Collector of the document the current thread is working on
+        self.keep_documents = keep_documents # Slowest documents kept for the report, so memory stays bounded
+        self.documents = [] # Heap of (seconds, order, timings and counts) of the slowest documents
+        self.document_count = 0
+        self.start = time.monotonic()
+        self.profiles = None # {stage: [merged pstats.Stats, calls]}, while profiling
+        self.profile_lock = threading.Lock() # Held by the call being profiled
+
+    def collector(self):
+        return getattr(self.local, 'collector', None)
+
+    def add(self, stage, seconds):
+        collector = self.collector()
+        if collector is not None:
+            collector.add_time(stage, seconds)
+            return
+        with self.lock:
+            self.add_time(stage, seconds)
+
+    def count(self, name, value=1):
+        collector = self.collector()
+        if collector is not None:
+            collector.add_count(name, value)
+            return
+        with self.lock:
+            self.add_count(name, value)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def document(self):
+        """
+        Records the timers and counters of one document apart from the rest of the run.
+
+        Yields a dict that is filled in on exit with the document's 'seconds', 'stages' and
+        'counters' (and its 'profile' while profiling). It can be returned from a worker
+        process and handed to add_document in the parent.
+        """
+        stats = {}
+        collector = Collector()
+        self.local.collector = collector
+        profiler = None
+        if self.profiles is not None:
+            import cProfile
+            profiler = cProfile.Profile()
+        start = time.perf_counter()
+
+        if profiler:
+            profiler.enable()
+        try:
+            yield stats
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.create_stats()
+                stats['profile'] = profiler.stats
+            self.local.collector = None
+            stats['seconds'] = round(time.perf_counter() - start, 4)
+            stats.update(collector.as_dict())
+
+    # Adds a document's stats, as yielded by document(), to the run
+    def add_document(self, name, stats):
+        with self.lock:
+            for stage, entry in stats['stages'].items():
+                self.add_time(stage, entry['seconds'], entry['calls'])
+            for counter, value in stats['counters'].items():
+                self.add_count(counter, value)
+            if 'profile' in stats and self.profiles is not None:
+                self.add_profile('document', stats['profile'])
+
+            document = {'name': name, 'seconds': stats['seconds'],
+                        'stages': {stage: entry['seconds'] for stage, entry in stats['stages'].items()},
+                        'counters': stats['counters']}
+            self.document_count += 1
+            item = (stats['seconds'], self.document_count, document)
+            if len(self.documents) < self.keep_documents:
+                heapq.heappush(self.documents, item)
+            else:
+                heapq.heappushpop(self.documents, item)
+
+    def enable_profiling(self):
+        if self.profiles is None:
+            self.profiles = {}
+
+    # Runs function under cProfile while profiling, filing the profile under stage
+    # Since Python 3.12 only one profiler can be active at a time, so a call starting while
+    # another is profiled runs unprofiled: concurrent stages are profiled on a sample of their calls
+    def profiled(self, function, stage):
+        if self.profiles is None:
+            return function
+
+        import cProfile
+
+        def wrapper(*args, **kwargs):
+            if not self.profile_lock.acquire(blocking=False):
+                return function(*args, **kwargs)
+
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(function, *args, **kwargs)
+            finally:
+                self.profile_lock.release()
+                profiler.create_stats()
+                self.add_profile(stage, profiler.stats)
+        return wrapper
+
+    # Merges one call's profile into its stage's
+    def add_profile(self, stage, profile):
+        import pstats
+
+        # pstats can't load an empty profile
+        if not profile:
+            return
+
+        with self.lock:
+            if stage in self.profiles:
+                self.profiles[stage][0].add(RawStats(profile))
+                self.profiles[stage][1] += 1
+            else:
+                self.profiles[stage] = [pstats.Stats(RawStats(profile)), 1]
+
+    def report(self):
+        report = {'elapsed': round(time.monotonic() - self.start, 3)}
+        report.update(self.as_dict())
+
+        # Slowest first; runs with more documents than keep_documents only list the slowest
+        documents = [document for _, _, document in sorted(self.documents, key=lambda item: (-item[0], item[1]))]
+        report['document_count'] = self.document_count
+        report['slowest_documents'] = [document['name'] for document in documents[:10]]
+        report['documents'] = documents
+        return report
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+    # Saves one <stage>.prof per profiled stage and prints where each spent the most time
+    def write_profiles(self, directory, top=15):
+        os.makedirs(directory, exist_ok=True)
+        for stage, (stats, calls) in sorted((self.profiles or {}).items()):
+            stats.dump_stats(os.path.join(directory, f"{stage}.prof"))
+
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats('cumulative').print_stats(top)
+            print(f"\n--- Profile: {stage} ({calls} calls) ---")
+            print(output.getvalue().strip())
+
+    # Text summary of the stages and counters
+    def summary(self):
+        lines = [f"{stage}: {seconds:.2f}s in {calls} calls"
+                 for stage, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])]
+        lines += [f"{name}: {value}" for name, value in sorted(self.counters.items())]
+        return lines
+
+
+# Metrics of the running script, shared by all modules
+metrics = Metrics()
+
+
+# Adds the --metrics and --profile options to a script's parser
+def add_arguments(parser):
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='Write timers, counters and per-document timings to this JSON file')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='Profile the run with cProfile and save one .prof file per stage in this folder')
+
+
+def setup(args):
+    if args.profile:
+        metrics.enable_profiling()
+
+
+# Writes the reports asked for on the command line once the run is over
+def finish(args):
+    if args.metrics:
+        metrics.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
+    if args.profile:
+        metrics.write_profiles(args.profile)
@@ -0,0 +1,223 @@
+import os
+import argparse
+import re
+import sqlite3
+from glob import glob
+from .article_analyser import PDFHighlighter, PageText, REGEX_CHARS
+from .analysis_cache import AnalysisCache
+
+
+class PDFIndex:
+    # Persistent full-text index of the page text of downloaded PDFs
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY, doi TEXT UNIQUE, path TEXT, size INTEGER, mtime REAL, hash TEXT);
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY, doc INTEGER, page INTEGER, text TEXT);
+            CREATE INDEX IF NOT EXISTS pages_doc ON pages (doc);
+            CREATE VIRTUAL TABLE IF NOT EXISTS page_fts USING fts5(
+                squashed, tokenize='trigram', content='');
+        """)
+        self.conn.commit()
+
+    # Page text without whitespace, since keywords may be split by spaces or line breaks anywhere
+    @staticmethod
+    def squash(text):
+        return re.sub(r'\s+', '', text)
+
+    # Adds new and changed PDFs of the folder to the index and drops the ones that are gone
+    def update(self, pdf_folder, cache=None):
+        known = {doi: (doc_id, size, mtime, doc_hash) for doc_id, doi, size, mtime, doc_hash
+                 in self.conn.execute("SELECT id, doi, size, mtime, hash FROM docs")}
+        added = 0
+        present = set()
+
+        for path in sorted(glob(os.path.join(pdf_folder, "*.pdf"))):
+            doi = os.path.basename(path)[:-4]
+            present.add(doi)
+            stat = os.stat(path)
+
+            row = known.get(doi)
+            if row and row[1] == stat.st_size and row[2] == stat.st_mtime:
+                continue
+
+            # A file that was only highlighted since it was indexed keeps its pages
+            doc_hash = cache.resolve(cache.file_hash(path)) if cache else None
+            if row and doc_hash and row[3] == doc_hash:
+                self.conn.execute("UPDATE docs SET size = ?, mtime = ? WHERE id = ?",
+                                  (stat.st_size, stat.st_mtime, row[0]))
+                continue
+
+            try:
+                texts = self.extract(path, doc_hash, cache)
+            except Exception as e:
+                print(f"Indexing {os.path.basename(path)} ... failed! ({type(e).__name__}: {e})")
+                continue
+
+            if row:
+                self.remove(row[0])
+
+            doc_id = self.conn.execute("INSERT INTO docs (doi, path, size, mtime, hash) VALUES (?, ?, ?, ?, ?)",
+                                       (doi, path, stat.st_size, stat.st_mtime, doc_hash)).lastrowid
+            for page_num, text in enumerate(texts):
+                page_id = self.conn.execute("INSERT INTO pages (doc, page, text) VALUES (?, ?, ?)",
+                                            (doc_id, page_num + 1, text)).lastrowid
+                self.conn.execute("INSERT INTO page_fts (rowid, squashed) VALUES (?, ?)",
+                                  (page_id, self.squash(text)))
+            added += 1
+
+        removed = [row[0] for doi, row in known.items() if doi not in present]
+        for doc_id in removed:
+            self.remove(doc_id)
+
+        self.conn.commit()
+        return added, len(removed)
+
+    # Page texts of a PDF, taken from the analyser's cache when it has them
+    def extract(self, path, doc_hash=None, cache=None):
+        pages = cache.load_pages(doc_hash) if cache else None
+        if pages is not None:
+            return [text for text, _, _ in pages]
+
+        from fitz import open as fitz_open
+        pdf_document = fitz_open(path)
+        pages = [PageText.from_page(pdf_page) for pdf_page in pdf_document]
+        pdf_document.close()
+
+        if cache:
+            cache.store_pages(doc_hash, [(page.text, page.boxes, page.lines) for page in pages])
+        return [page.text for page in pages]
+
+    def remove(self, doc_id):
+        for page_id, text in self.conn.execute("SELECT id, text FROM pages WHERE doc = ?", (doc_id,)).fetchall():
+            self.conn.execute("INSERT INTO page_fts (page_fts, rowid, squashed) VALUES ('delete', ?, ?)",
+                              (page_id, self.squash(text)))
+        self.conn.execute("DELETE FROM pages WHERE doc = ?", (doc_id,))
+        self.conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+    # Literal strings one of which must appear, squashed, on any page the keyword matches
+    # Returns None when the keyword can't be narrowed down and every page has to be scanned
+    def search_terms(self, word):
+        if word[-2:] == '*C':
+            citation = re.match(r'^(.*?)(\(\d{4}\)|\d{4})$', word.split(' / ')[0])
+            terms = citation.group(1).split(',') + [word[:-3].split(' / ')[1]]
+        elif word[-2:] == '*U':
+            terms = [word[0:-3]]
+        else:
+            terms = [word]
+
+        terms = [self.squash(term) for term in terms]
+        if any(len(term) < 3 or not term.isascii() or REGEX_CHARS & set(term) for term in terms):
+            return None
+        return terms
+
+    # Pages that may contain any of the keywords, or None if all pages have to be scanned
+    def candidate_pages(self, keywords):
+        page_ids = set()
+        for word in dict.fromkeys(keywords):
+            terms = self.search_terms(word)
+            if terms is None:
+                return None
+
+            query = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            page_ids.update(row[0] for row in self.conn.execute(
+                "SELECT rowid FROM page_fts WHERE page_fts MATCH ?", (query,)))
+        return page_ids
+
+    # Finds the keywords in the index, returning the same rows as PDFHighlighter.format_record
+    # With include_missing, documents without a keyword get its "NA" row too
+    def query(self, keywords, include_missing=False):
+        import pandas as pd
+
+        highlighter = PDFHighlighter.for_keywords(keywords, highlight='none')
+        page_ids = self.candidate_pages(keywords)
+
+        if page_ids is None:
+            pages = self.conn.execute("SELECT docs.doi, pages.page, pages.text FROM pages JOIN docs ON docs.id = pages.doc")
+        else:
+            page_ids = sorted(page_ids)
+            pages = []
+            for i in range(0, len(page_ids), 500):
+                chunk = page_ids[i:i + 500]
+                pages.extend(self.conn.execute(
+                    f"SELECT docs.doi, pages.page, pages.text FROM pages JOIN docs ON docs.id = pages.doc "
+                    f"WHERE pages.id IN ({','.join('?' * len(chunk))})", chunk))
+
+        # (DOI, page, keyword index, context) of every instance
+        instances = []
+        for doi, page_num, text in pages:
+            page_matches = highlighter.matcher.find(text)
+            sentences = highlighter.sentence_spans(text) if any(page_matches) else None
+
+            for index, matches in enumerate(page_matches):
+                for match in matches:
+                    instances.append((doi, page_num, index, highlighter.match_context(text, match, sentences)))
+        instances.sort(key=lambda instance: instance[:3])
+
+        rows = [(doi, keywords[index], page_num, context) for doi, page_num, index, context in instances]
+
+        if include_missing:
+            found = {(doi, keywords[index]) for doi, _, index, _ in instances}
+            for (doi,) in self.conn.execute("SELECT doi FROM docs"):
+                for word in dict.fromkeys(keywords):
+                    if (doi, word) not in found:
+                        rows.append((doi, word, 0, "NA"))
+            rows.sort(key=lambda row: (row[0], row[2] == 0))
+
+        return pd.DataFrame(rows, columns=['DOIs', 'key_values', 'Pages', 'Context'])
+
+    def close(self):
+        self.conn.close()
+
+
+# Command call for directory and files
+def parse_args():
+    parser = argparse.ArgumentParser(description='PDF full-text index')
+    parser.add_argument('-i', '--index', type=str, default='./pdf_index.sqlite',
+                        help='Path to the index file')
+    parser.add_argument('-f', '--pdf_folder', type=str, default='./all_pdfs',
+                        help='Path to pdfs folder, new and changed PDFs are indexed before querying')
+    parser.add_argument('-q', '--query', type=str, action='append', default=[],
+                        help='Keyword to look up, same syntax as the keywords file (can be repeated)')
+    parser.add_argument('-k', '--keywords', type=str, default=None,
+                        help='Path to keywords file to look up')
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='Write the rows to this CSV file instead of printing them')
+    parser.add_argument('--cache', type=str, default='./analysis_cache.sqlite',
+                        help="Analyser's store of extracted text, reused when indexing")
+    parser.add_argument('--no_update', action='store_true',
+                        help='Query the index as it is, without scanning the folder')
+    parser.add_argument('--include_missing', action='store_true',
+                        help='Add an "NA" row for every document without a keyword, like article_analyser.py')
+    return parser.parse_args()
+
+# Usage
+def main():
+    args = parse_args()
+
+    index = PDFIndex(args.index)
+
+    if not args.no_update:
+        cache = AnalysisCache(args.cache) if args.cache else None
+        added, removed = index.update(args.pdf_folder, cache)
+        print(f"Indexed {added} new or changed PDFs, removed {removed}")
+
+    keywords = list(args.query)
+    if args.keywords:
+        keywords += PDFHighlighter.load_keywords(args.keywords)
+
+    if keywords:
+        df = index.query(keywords, args.include_missing)
+        df.Context = df.Context.str.replace("\n", "")
+        if args.output:
+            df.to_csv(args.output, index=False)
+        else:
+            print(df.to_string(index=False))
+
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import os
+import argparse
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .article_io import ResultWriter, NUMERIC_COLUMNS
+from .article_download import HTTPDownloader, BrowserPool, aea_dois, PDF_URL
+from .article_analyser import PDFHighlighter, init_worker, process_pdf
+from .download_manifest import DownloadManifest
+from .http_utils import RateLimiter, HostRateLimiter
+from .metadata import MetadataIndex
+from .metrics import metrics, add_arguments as add_metrics_arguments, setup as setup_metrics, finish as finish_metrics
+from .search import iter_search, build_queries, parse_years, load_from_file, clean_df, BATCH_SIZE
+from .serp_cache import ResponseCache
+
+# Put on a queue after its last item
+DONE = None
+
+
+class Pipeline:
+    # Runs search, download and analysis at the same time, handing each article to the next stage as soon as it's ready
+    def __init__(self, folder_path, keywords, download_workers=8, browser_workers=2, analysis_workers=2,
+                 queue_size=100, url_template=PDF_URL, manifest=None, host_rate=None,
+                 cache_path=None, highlight='inplace', output_dir=None):
+        self.folder_path = folder_path
+        self.keywords = keywords
+        self.download_workers = download_workers
+        self.browser_workers = browser_workers # 0 to report PDFs that need a browser as failed
+        self.analysis_workers = analysis_workers
+        self.manifest = manifest
+        self.analysis_args = (keywords, cache_path, highlight, output_dir)
+
+        rate_limiter = HostRateLimiter(host_rate)
+        self.downloader = HTTPDownloader(folder_path, download_workers, url_template, rate_limiter=rate_limiter)
+        self.browsers = BrowserPool(folder_path, browser_workers, url_template, rate_limiter=rate_limiter) \
+            if browser_workers else None
+
+        # Bounded, so a fast stage waits for a slow one instead of piling up work
+        self.download_queue = queue.Queue(queue_size)
+        self.browser_queue = queue.Queue(queue_size)
+        self.analysis_queue = queue.Queue(queue_size)
+
+        self.seen = set() # DOIs already sent to download
+        self.metadata = MetadataIndex() # Titles and authors of the articles found, for the analysis output
+        self.failed = [] # (stage, item, error) of everything that didn't make it through
+        self.counts = {'articles': 0, 'pdfs': 0, 'analysed': 0}
+        self.start = None
+        self.first_result = None # Seconds from start to the first analysed PDF
+
+    def fail(self, stage, item, error):
+        print(f"{stage.capitalize()} {item} ... failed! ({error})")
+        self.failed.append((stage, item, error))
+
+    # Starts a pool of threads running work on every item of inbox, and calls close once they have all stopped
+    def start_stage(self, name, work, inbox, workers, close):
+        work = metrics.profiled(work, name)
+
+        def loop():
+            while True:
+                item = inbox.get()
+                if item is DONE:
+                    inbox.put(DONE) # Lets the other threads of the stage stop too
+                    return
+                try:
+                    work(item)
+                except Exception as e:
+                    self.fail(name, item, f"{type(e).__name__}: {e}")
+
+        threads = [threading.Thread(target=loop, name=f"{name}-{i}", daemon=True) for i in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+
+        def finish():
+            for thread in threads:
+                thread.join()
+            close()
+        threading.Thread(target=finish, name=f"{name}-close", daemon=True).start()
+
+    # Search stage: writes the articles found and queues the AEA DOIs for download
+    # Journals are searched in batches as in search.py, search_options are those of iter_search
+    def search(self, keywords, api_key, year_lo, year_hi, articles_path, **search_options):
+        import pandas as pd
+
+        try:
+            batch = []
+            with ResultWriter(articles_path, NUMERIC_COLUMNS) as writer:
+                for _, results in iter_search(keywords, api_key, year_lo=year_lo, year_hi=year_hi, **search_options):
+                    df = pd.DataFrame(results)
+                    clean_df(df)
+                    self.add_articles(df)
+
+                    batch.append(df)
+                    if sum(len(page) for page in batch) >= BATCH_SIZE:
+                        writer.write(pd.concat(batch, ignore_index=True))
+                        batch = []
+
+                if batch:
+                    writer.write(pd.concat(batch, ignore_index=True))
+        except Exception as e:
+            self.fail('search', 'keywords', f"{type(e).__name__}: {e}")
+        finally:
+            self.download_queue.put(DONE)
+
+    def add_articles(self, df):
+        self.counts['articles'] += len(df)
+
+        # Metadata for the analysis output, first occurrence wins as in article_analyser.py
+        self.metadata.add_articles(df)
+
+        for doi in aea_dois(df):
+            if doi != "NA" and doi not in self.seen:
+                self.seen.add(doi)
+                self.download_queue.put(doi) # Blocks while downloads are behind
+
+    # Download stage: PDFs already on disk go straight to analysis
+    def download(self, doi):
+        path = self.downloader.file_path(doi)
+        if self.manifest:
+            reason = self.manifest.skip_reason(doi, path)
+        else:
+            reason = 'done' if os.path.exists(path) else None
+
+        if reason == 'done':
+            self.analysis_queue.put(path)
+            return
+        if reason:
+            self.fail('download', doi, f"skipped, {reason}")
+            return
+
+        _, status, detail = self.downloader.download(doi)
+        if status == 'browser' and self.browsers:
+            self.browser_queue.put(doi)
+        else:
+            self.finish_download(doi, status, detail)
+
+    def browser_download(self, doi):
+        self.finish_download(*self.browsers.download(doi))
+
+    def finish_download(self, doi, status, detail):
+        if status == 'ok':
+            path = self.downloader.file_path(doi)
+            if self.manifest:
+                self.manifest.mark_ok(doi, path)
+            self.counts['pdfs'] += 1
+            self.analysis_queue.put(path)
+        else:
+            if self.manifest:
+                self.manifest.mark_failed(doi, detail)
+            self.fail('download', doi, detail)
+
+    def close_downloads(self):
+        (self.browser_queue if self.browsers else self.analysis_queue).put(DONE)
+
+    def close_browsers(self):
+        self.browsers.close()
+        self.analysis_queue.put(DONE)
+
+    # Analysis stage, on the calling thread: PDFs are scanned by a process pool and written as they finish
+    def analyse(self, writer):
+        # Forking while the other stages' threads are running isn't safe
+        context = multiprocessing.get_context('spawn')
+        limit = 2 * self.analysis_workers # PDFs handed to the pool at once, the rest waits in the queue
+        pending = set()
+        receiving = True
+
+        with ProcessPoolExecutor(self.analysis_workers, mp_context=context, initializer=init_worker,
+                                 initargs=self.analysis_args + (metrics.profiles is not None,)) as executor:
+            while receiving or pending:
+                if receiving and len(pending) < limit:
+                    # Only wait briefly for new PDFs while results may be coming in
+                    try:
+                        pdf = self.analysis_queue.get(timeout=0.1) if pending else self.analysis_queue.get()
+                        if pdf is DONE:
+                            receiving = False
+                        else:
+                            pending.add(executor.submit(process_pdf, pdf))
+                    except queue.Empty:
+                        pass
+                    done, pending = wait(pending, timeout=0)
+                else:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    self.write_record(writer, *future.result())
+
+    def write_record(self, writer, pdf, record, error, stats):
+        import pandas as pd
+
+        metrics.add_document(os.path.basename(pdf), stats)
+        if error:
+            self.fail('analysing', os.path.basename(pdf), error)
+            return
+
+        DOIs, pages, key_values, context = record
+        df = pd.DataFrame({'DOIs': DOIs, 'key_values': key_values, 'Pages': pages, 'Context': context})
+        df.Context = df.Context.str.replace("\n", "")
+        df['title'], df['author'] = self.metadata.lookup(os.path.basename(pdf)[:-4], pdf)
+        writer.write(df)
+
+        self.counts['analysed'] += 1
+        if self.first_result is None:
+            self.first_result = time.monotonic() - self.start
+        print(f"Analysed {self.counts['analysed']}: {os.path.basename(pdf)} ... done!")
+
+    def run(self, keywords, api_key, year_lo, year_hi, articles_path, output_path, **search_options):
+        os.makedirs(self.folder_path, exist_ok=True)
+        self.start = time.monotonic()
+
+        threading.Thread(target=self.search, name='search', daemon=True,
+                         args=(keywords, api_key, year_lo, year_hi, articles_path), kwargs=search_options).start()
+        self.start_stage('download', self.download, self.download_queue, self.download_workers, self.close_downloads)
+        if self.browsers:
+            self.start_stage('browser', self.browser_download, self.browser_queue, self.browser_workers,
+                             self.close_browsers)
+
+        with ResultWriter(output_path) as writer:
+            self.analyse(writer)
+
+        elapsed = time.monotonic() - self.start
+        print("\n--- Summary ---")
+        print(f"Articles found: {self.counts['articles']}")
+        print(f"PDFs downloaded: {self.counts['pdfs']}")
+        print(f"PDFs analysed: {self.counts['analysed']}")
+        if self.first_result is not None:
+            print(f"First result after {self.first_result:.1f}s")
+        print(f"Total time: {elapsed:.1f}s")
+        if self.failed:
+            print(f"{len(self.failed)} items failed:")
+            for stage, item, error in self.failed:
+                print(f"  {stage} {item}: {error}")
+
+
+# Command call for directory and files
+def parse_args():
+    parser = argparse.ArgumentParser(description='Search, download and analyse articles in one streaming run')
+    parser.add_argument("-k", "--keyword_filepath", help="Path to the .txt file containing search keywords (one per line).")
+    parser.add_argument("-j", "--journal_filepath", default=None, help="Path to the .txt file containing journals (one per line).")
+    parser.add_argument("-a", "--api_key", help="API key for accessing the SERP API.")
+    parser.add_argument("-y", "--year", default="1800:2023", help="Year range for articles in format year_lo:year_hi.")
+    parser.add_argument("-c", "--cites", default="", help="Comma-separated list of citation IDs.")
+    parser.add_argument("-t", "--test", default=0, type=int, help="Run in test mode to limit to two pages.")
+    parser.add_argument("-m", "--max_results", default=0, type=int, help="Skip searches with more results than this (0 for no limit).")
+    parser.add_argument('-K', '--analysis_keywords', type=str, default='./keywords.txt',
+                        help='Path to keywords file to look for in the PDFs')
+    parser.add_argument('-f', '--folder', type=str, default='./all_pdfs',
+                        help='Directory where PDFs will be downloaded')
+    parser.add_argument('--articles_output', type=str, default='serp_articles_data.csv',
+                        help='Search results file, written as Parquet for .parquet paths and CSV otherwise')
+    parser.add_argument('-o', '--output', type=str, default='key_words_freq.csv',
+                        help='Keyword instances file, written as Parquet for .parquet paths and CSV otherwise')
+    parser.add_argument('--search_workers', type=int, default=4, help='Number of concurrent requests to the SERP API')
+    parser.add_argument('--rate', type=float, default=5.0, help='Maximum requests per second to the SERP API (0 for no limit)')
+    parser.add_argument('--journal_batch', type=int, default=8,
+                        help='Journals searched together in one query (1 for one query per journal)')
+    parser.add_argument('--download_workers', type=int, default=8, help='Number of PDFs downloaded at the same time over HTTP')
+    parser.add_argument('--browser_workers', type=int, default=2,
+                        help='Number of headless browsers for PDFs that need one (0 to report them as failed)')
+    parser.add_argument('--host_rate', type=float, default=2.0,
+                        help='Maximum download requests per second to any one host (0 for no limit)')
+    parser.add_argument('--analysis_workers', type=int, default=2, help='Number of processes scanning PDFs')
+    parser.add_argument('--queue_size', type=int, default=100, help='Items waiting between two stages before the first one pauses')
+    parser.add_argument('--url_template', type=str, default=PDF_URL,
+                        help='URL of the PDF of a DOI, with {doi} in place of the DOI')
+    parser.add_argument('--highlight', type=str, default='inplace', choices=['inplace', 'copy', 'none'],
+                        help="Highlight matches in the PDFs themselves, in copies saved to --output_dir, or not at all")
+    parser.add_argument('--output_dir', type=str, default='./highlighted_pdfs',
+                        help="Folder for highlighted copies when using --highlight copy")
+    parser.add_argument('--serp_cache', type=str, default='serp_cache.sqlite', help='Path to the on-disk cache of SERP API responses')
+    parser.add_argument('--analysis_cache', type=str, default='./analysis_cache.sqlite',
+                        help='Store of extracted text and results, so reruns only scan new PDFs and keywords')
+    parser.add_argument('--manifest', type=str, default='./download_manifest.sqlite',
+                        help='Path to the record of downloaded and failed DOIs')
+    parser.add_argument('--no_cache', action='store_true', help='Use neither the response cache nor the analysis cache')
+    parser.add_argument('--no_manifest', action='store_true', help='Do not record downloads')
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+# Usage
+def main():
+    args = parse_args()
+    setup_metrics(args)
+    keywords = load_from_file(args.keyword_filepath)
+    journals = load_from_file(args.journal_filepath) if args.journal_filepath else [None]
+    year_lo, year_hi = parse_years(args.year)
+    cites_list = args.cites.split(",") if args.cites else []
+    test_mode = bool(int(args.test))
+
+    queries, _ = build_queries(keywords, journals, cites_list)
+
+    cache = None
+    if not args.no_cache:
+        run = ResponseCache.make_key({"queries": queries, "year_lo": year_lo, "year_hi": year_hi,
+                                      "test": test_mode, "max_results": args.max_results,
+                                      "journal_batch": args.journal_batch})
+        cache = ResponseCache(args.serp_cache, run=run)
+    manifest = None if args.no_manifest else DownloadManifest(args.manifest)
+
+    pipeline = Pipeline(args.folder, PDFHighlighter.load_keywords(args.analysis_keywords), args.download_workers,
+                        args.browser_workers, args.analysis_workers, args.queue_size, args.url_template, manifest,
+                        args.host_rate or None, None if args.no_cache else args.analysis_cache,
+                        args.highlight, args.output_dir)
+    pipeline.run(keywords, args.api_key, year_lo, year_hi, args.articles_output, args.output,
+                 journals=journals, cites_list=cites_list, test_mode=test_mode, max_results=args.max_results,
+                 workers=args.search_workers, journal_batch=args.journal_batch,
+                 rate_limiter=RateLimiter(args.rate), cache=cache)
+
+    if cache:
+        cache.finish_run()
+        cache.close()
+    if manifest:
+        manifest.close()
+    finish_metrics(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,690 @@
+# requests and pandas are imported where they're used, so the CLI starts fast
+import argparse
+import heapq
+import os
+import re
+from .article_io import ResultWriter, NUMERIC_COLUMNS
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .http_utils import make_session, RateLimiter
+from .metrics import metrics, add_arguments as add_metrics_arguments, setup as setup_metrics, finish as finish_metrics
+from .serp_cache import ResponseCache
+
+# Base URL for the SERP API
+SERP_URL = "https://serpapi.com/search"
+
+# Number of results requested per page
+RESULTS_PER_PAGE = 20
+
+# Number of rows cleaned and written to the output at a time
+BATCH_SIZE = 500
+
+# Google Scholar serves at most this many results of a query, however many it reports
+SCHOLAR_RESULT_CAP = 1000
+
+# Share of the cap at which a batch of journals is split, so that no results are cut off
+SPLIT_RATIO = 0.9
+
+def parse_arg():
+    parser = argparse.ArgumentParser(description="Get scholar data for keywords and journals from .txt files.")
+    parser.add_argument("-k", "--keyword_filepath", help="Path to the .txt file containing keywords (one per line).")
+    parser.add_argument("-j", "--journal_filepath", default=None, help="Path to the .txt file containing journals (one per line).")
+    parser.add_argument("-a", "--api_key", help="API key for accessing the SERP API.")
+    parser.add_argument("-y", "--year", default="1800:2023", help="Year range for articles in format year_lo:year_hi.")
+    parser.add_argument("-c", "--cites", default="", help="Comma-separated list of citation IDs.")
+    parser.add_argument("-t", "--test", default=0, type=int, help="Run in test mode to limit to two pages.")
+    parser.add_argument("-w", "--workers", default=4, type=int, help="Number of concurrent requests to the SERP API.")
+    parser.add_argument("-r", "--rate", default=5.0, type=float, help="Maximum requests per second to the SERP API (0 for no limit).")
+    parser.add_argument("-m", "--max_results", default=0, type=int, help="Skip searches with more results than this (0 for no limit).")
+    parser.add_argument("-o", "--output", default="serp_articles_data.csv", help="Output file, written as Parquet for .parquet paths and CSV otherwise.")
+    parser.add_argument("--cache", default="serp_cache.sqlite", help="Path to the on-disk cache of SERP API responses.")
+    parser.add_argument("--cache_ttl", default=30, type=float, help="Days before a cached response is fetched again.")
+    parser.add_argument("--cache_size", default=500, type=float, help="Maximum size of the response cache in MB.")
+    parser.add_argument("--no_cache", action="store_true", help="Always fetch from the SERP API and do not cache responses.")
+    parser.add_argument("--journal_batch", default=8, type=int, help="Journals searched together in one query (1 for one query per journal).")
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+
+def load_from_file(filepath):
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"The file {filepath} does not exist.")
+
+    with open(filepath, 'r') as file:
+        items = [line.strip() for line in file.readlines()]
+    return items
+
+
+# year_lo and year_hi of a "year_lo:year_hi" range, either of which may be left out
+def parse_years(year):
+    year_range = year.split(":")
+    year_lo = year_range[0] if year_range[0] else "1800"
+    year_hi = year_range[1] if len(year_range) > 1 and year_range[1] else "2023"
+    return year_lo, year_hi
+
+
+# Every keyword x journal x cites search, in the order results are merged
+# Returns the (query, cites) pairs and the index of the keyword of each
+def build_queries(keywords, journals, cites_list):
+    queries = []
+    query_keywords = []
+
+    for keyword_id, keyword in enumerate(keywords):
+        for journal in journals:
+            query = f"{keyword} source:\"{journal}\"" if journal else keyword
+
+            for cites in cites_list or [None]:
+                queries.append((query, cites))
+                query_keywords.append(keyword_id)
+
+    return queries, query_keywords
+
+
+def build_params(keyword, api_key, year_lo, year_hi, cites=None, start=0):
+    # Parameters for the API request
+    params = {
+        "q": keyword,  # Query keyword
+        "engine": "google_scholar",  # Specify the search engine as Google Scholar
+        "api_key": api_key,  # API key
+        "start": start,  # Pagination start
+        "num": RESULTS_PER_PAGE,  # Number of results per page
+        "as_ylo": year_lo,  # Starting year
+        "as_yhi": year_hi  # Ending year
+    }
+
+    # If cites ID is provided, add it to the parameters
+    if cites:
+        params["cites"] = cites
+
+    # Citing articles can be listed without a keyword
+    if not keyword:
+        del params["q"]
+
+    return params
+
+
+def fetch_page(params, session=None, rate_limiter=None, cache=None):
+    # Serve the page from the cache when we already have it
+    if cache:
+        data = cache.get(params)
+        if data is not None:
+            metrics.count('serp_cache_hits')
+            return data
+
+    # Wait for our turn if requests are rate limited
+    if rate_limiter:
+        with metrics.timer('rate_limit_wait'):
+            rate_limiter.wait()
+
+    if session is None:
+        import requests
+        session = requests
+
+    # Make the API request
+    with metrics.timer('serp_request'):
+        response = session.get(SERP_URL, params=params)
+        metrics.count('serp_requests')
+        # Raise an exception if the request was unsuccessful
+        response.raise_for_status()
+
+        # Parse the JSON response
+        data = response.json()
+
+    if cache:
+        cache.put(params, data)
+
+    return data
+
+
+class QueryPlanner:
+    # Searches several journals in one query, splitting a batch only when its results near Scholar's cap
+    def __init__(self, api_key, year_lo, year_hi, batch_size=8, max_results=0, workers=4,
+                 session=None, rate_limiter=None, cache=None):
+        self.api_key = api_key
+        self.year_lo = year_lo
+        self.year_hi = year_hi
+        self.batch_size = batch_size
+        self.max_results = max_results
+        self.workers = max(1, workers)
+        self.session = session or make_session(self.workers)
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.keywords = []
+        self.query_keywords = [] # Index of the keyword of each planned query
+        self.query_journals = [] # Journals covered by each planned query
+        self.query_cites = [] # Cites ID of each planned query
+        self.unmatched = {} # Query index: results whose journal could not be told from their summary
+
+    @staticmethod
+    def batch_query(keyword, journals):
+        return f"{keyword} " + " OR ".join(f"source:\"{journal}\"" for journal in journals)
+
+    def too_many(self, total_results):
+        return total_results >= SPLIT_RATIO * SCHOLAR_RESULT_CAP or \
+            bool(self.max_results and total_results > self.max_results)
+
+    def plan(self, keywords, journals, cites_list):
+        """
+        Plans the searches for every keyword x journal x cites with as few queries as possible.
+
+        Page one of every batch is fetched concurrently; batches with too many results are
+        halved and fetched again until they fit or hold a single journal.
+
+        Returns:
+        - list: (query, cites) pairs for iter_scholar_data.
+        - list: The index of the keyword of each query.
+        - dict: The response for page one of each query, by query index.
+        """
+        self.keywords = keywords
+
+        # (position, keyword index, journals, cites) of the batches still to check
+        batches = []
+        for keyword_id in range(len(keywords)):
+            for start in range(0, len(journals), self.batch_size):
+                for cites in cites_list or [None]:
+                    batches.append(((len(batches),), keyword_id, journals[start:start + self.batch_size], cites))
+
+        planned = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while batches:
+                futures = [executor.submit(metrics.profiled(fetch_page, 'search'), build_params(self.batch_query(keywords[keyword_id], batch),
+                                                                    self.api_key, self.year_lo, self.year_hi, cites),
+                                           self.session, self.rate_limiter, self.cache)
+                           for _, keyword_id, batch, cites in batches]
+
+                split = []
+                for (position, keyword_id, batch, cites), future in zip(batches, futures):
+                    data = future.result()
+                    total_results = data.get('search_information', {}).get('total_results', 0)
+
+                    if len(batch) > 1 and self.too_many(total_results):
+                        half = len(batch) // 2
+                        split.append((position + (0,), keyword_id, batch[:half], cites))
+                        split.append((position + (1,), keyword_id, batch[half:], cites))
+                    else:
+                        planned.append((position, keyword_id, batch, cites, data))
+                batches = split
+
+        # Same order as one query per journal would have had
+        planned.sort(key=lambda query: query[0])
+
+        queries = [(self.batch_query(keywords[keyword_id], batch), cites) for _, keyword_id, batch, cites, _ in planned]
+        self.query_keywords = [keyword_id for _, keyword_id, _, _, _ in planned]
+        self.query_journals = [batch for _, _, batch, _, _ in planned]
+        self.query_cites = [cites for _, _, _, cites, _ in planned]
+        first_pages = {query_id: query[4] for query_id, query in enumerate(planned)}
+        return queries, self.query_keywords, first_pages
+
+    # Journal of a result, read from the venue of its summary ("Authors - Venue, Year - Host")
+    # The venue may carry a subtitle, as in "Econometrica: Journal of the Econometric Society"
+    @staticmethod
+    def match_journal(summary, journals):
+        parts = (summary or "").split(" - ")
+        if len(parts) < 2:
+            return None
+
+        def normalise(name):
+            name = " ".join(name.lower().split())
+            return name[4:] if name.startswith("the ") else name
+
+        venue = normalise(re.sub(r",?\s*\d{4}$", "", parts[1].strip()))
+        truncated = venue.endswith("…")
+        venue = venue.rstrip("…").strip()
+        if not venue:
+            return None
+
+        for journal in journals:
+            name = normalise(journal)
+            if re.fullmatch(re.escape(name).replace(r"\*", ".*") + r"(?:\s*[:,].*)?", venue):
+                return journal
+            # Long venues are cut short with an ellipsis
+            if truncated and name.replace("*", "").startswith(venue):
+                return journal
+        return None
+
+    # Gives each result of a planned query the keyword and journal of its own search
+    # Results that match none of the batch's journals are held back for the fallback
+    def attribute(self, query_id, entries):
+        keyword = self.keywords[self.query_keywords[query_id]]
+        journals = self.query_journals[query_id]
+
+        attributed = []
+        for entry in entries:
+            journal = journals[0] if len(journals) == 1 else self.match_journal(entry["Authors"], journals)
+            if journal is None:
+                self.unmatched.setdefault(query_id, []).append(entry)
+                continue
+            entry["Keyword"] = self.batch_query(keyword, [journal])
+            attributed.append(entry)
+
+        return attributed
+
+    # One query per journal for every batch with results that couldn't be attributed, of which
+    # only the first page is fetched: at most batch_size requests per such batch
+    # Returns the (query, cites) pairs, the index of the keyword of each and the batch it stands for
+    def fallback(self):
+        queries, query_keywords, batches = [], [], []
+        for query_id in sorted(self.unmatched):
+            keyword = self.keywords[self.query_keywords[query_id]]
+            for journal in self.query_journals[query_id]:
+                queries.append((self.batch_query(keyword, [journal]), self.query_cites[query_id]))
+                query_keywords.append(self.query_keywords[query_id])
+                batches.append(query_id)
+        return queries, query_keywords, batches
+
+    # Held back results of a batch that a single-journal query found, with that query as their Keyword
+    def resolve(self, batch_id, entries):
+        keywords = {entry["Result ID"]: entry["Keyword"] for entry in entries if entry["Result ID"]}
+        found, missing = [], []
+        for entry in self.unmatched.get(batch_id, []):
+            if entry["Result ID"] in keywords:
+                entry["Keyword"] = keywords[entry["Result ID"]]
+                found.append(entry)
+            else:
+                missing.append(entry)
+        self.unmatched[batch_id] = missing
+        return found
+
+    # Held back results no single-journal query found, kept under their keyword alone without a Publisher
+    def leftovers(self):
+        for query_id, entries in sorted(self.unmatched.items()):
+            for entry in entries:
+                entry["Keyword"] = self.keywords[self.query_keywords[query_id]]
+            if entries:
+                yield self.query_keywords[query_id], entries
+        self.unmatched = {}
+
+
+def accept_query(keyword, data, max_results):
+    # Non-blocking replacement for the old interactive confirmation
+    total_results = data.get('search_information', {}).get('total_results', 0)
+    if max_results and total_results > max_results:
+        print(f"Skipping {keyword}: {total_results} results exceed the limit of {max_results}")
+        return False
+    return True
+
+
+def parse_results(keyword, results):
+    entries = []
+
+    # Iterate over each result and extract relevant data
+    for result in results:
+        entry = {
+            "Keyword": keyword,
+            "Title": result.get('title'),
+            "Result ID": result.get('result_id'),
+            "Link": result.get('link'),
+            "Snippet": result.get('snippet'),
+            "Authors": result.get('publication_info', {}).get('summary'),
+            "Total Citations": result.get('inline_links', {}).get('cited_by', {}).get('total', "NA"),
+            "Cited By Link": result.get('inline_links', {}).get('cited_by', {}).get('link'),
+            "Cites ID": result.get('inline_links', {}).get('cited_by', {}).get('cites_id'),
+            "Related Pages Link": result.get('inline_links', {}).get('related_pages_link'),
+            "Versions Total": result.get('inline_links', {}).get('versions', {}).get('total', "NA"),
+            "Versions Link": result.get('inline_links', {}).get('versions', {}).get('link'),
+            "Cluster ID": result.get('inline_links', {}).get('versions', {}).get('cluster_id'),
+            "Cached Page Link": result.get('inline_links', {}).get('cached_page_link'),
+            "SerpAPI Cite Link": result.get('inline_links', {}).get('serpapi_cite_link'),
+            "SerpAPI Scholar Link (Cited By)": result.get('inline_links', {}).get('cited_by', {}).get('serpapi_scholar_link'),
+            "SerpAPI Related Pages Link": result.get('inline_links', {}).get('serpapi_related_pages_link'),
+            "SerpAPI Scholar Link (Versions)": result.get('inline_links', {}).get('versions', {}).get('serpapi_scholar_link')
+        }
+
+        # Append the extracted data to the results list
+        entries.append(entry)
+
+    return entries
+
+
+def iter_scholar_data(queries, api_key, year_lo, year_hi, test_mode=False, max_results=0,
+                      workers=4, session=None, rate_limiter=None, cache=None, first_pages=None, max_pages=0):
+    """
+    Fetches scholarly data for many queries concurrently using the SERP API.
+
+    Pages are fetched by a pool of worker threads sharing one pooled HTTP session.
+    Once page one of a query arrives, every page its result count calls for is
+    requested at once. Scholar's count is only an estimate, often too low, so past
+    those pages page N+1 is requested as soon as page N comes back full. A short or
+    empty page ends the query, and no page past Scholar's cap is ever requested.
+    Pages are yielded in a stable order no matter when they arrive.
+
+    Parameters:
+    - queries (list): (keyword, cites) pairs to search for; cites may be None.
+    - api_key (str): The API key for SERP API.
+    - year_lo (int): The starting year for the search range.
+    - year_hi (int): The ending year for the search range.
+    - test_mode (bool, optional): If True, limits each search to 2 pages. Defaults to False.
+    - max_results (int, optional): Skips searches with more results than this. Defaults to 0 (no limit).
+    - workers (int, optional): Maximum number of requests in flight. Defaults to 4.
+    - session (requests.Session, optional): Session to reuse. Defaults to a new pooled session.
+    - rate_limiter (RateLimiter, optional): Limiter shared by all requests. Defaults to None.
+    - cache (ResponseCache, optional): Cache to read pages from and store them in. Defaults to None.
+    - first_pages (dict, optional): Responses for page one of some queries, by query index. Defaults to None.
+    - max_pages (int, optional): Most pages fetched per query. Defaults to 0 (no limit).
+
+    Yields:
+    - int: The index of the query in `queries`.
+    - list: A list of dictionaries with the scholarly data of one page.
+    """
+
+    workers = max(1, workers)
+    session = session or make_session(workers)
+
+    # Pages still to request, lowest (query, page) first so earlier queries finish first
+    to_fetch = []
+
+    # Requests in flight and pages waiting to be yielded
+    in_flight = {}
+    fetched = {}
+
+    # Pages of each query queued or in flight, pages planned so far, and the first page past its end
+    outstanding = [0] * len(queries)
+    planned = [1] * len(queries)
+    ends = {}
+
+    # Pages per query: 2 in test mode, at most max_pages, and never past the cap
+    page_limit = SCHOLAR_RESULT_CAP // RESULTS_PER_PAGE
+    if test_mode:
+        page_limit = min(page_limit, 2)
+    if max_pages:
+        page_limit = min(page_limit, max_pages)
+
+    def push(query_id, page):
+        heapq.heappush(to_fetch, (query_id, page))
+        outstanding[query_id] += 1
+
+    for query_id in range(len(queries)):
+        push(query_id, 0)
+
+    # Next (query, page) to be yielded
+    next_query, next_page = 0, 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while to_fetch or in_flight:
+            # Keep the pool busy without queueing more than it can run
+            while to_fetch and len(in_flight) < workers:
+                query_id, page = heapq.heappop(to_fetch)
+
+                # Pages planned past the end of a query are never requested
+                if page >= ends.get(query_id, page + 1):
+                    outstanding[query_id] -= 1
+                    continue
+
+                if page == 0 and first_pages and query_id in first_pages:
+                    future = Future()
+                    future.set_result(first_pages[query_id])
+                else:
+                    keyword, cites = queries[query_id]
+                    params = build_params(keyword, api_key, year_lo, year_hi, cites, page * RESULTS_PER_PAGE)
+                    future = executor.submit(metrics.profiled(fetch_page, 'search'), params, session, rate_limiter, cache)
+                in_flight[future] = (query_id, page)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                query_id, page = in_flight.pop(future)
+                outstanding[query_id] -= 1
+                keyword = queries[query_id][0]
+                data = future.result()
+
+                # Extract the organic results from the response
+                results = data.get('organic_results', [])
+
+                # No results, or too many to fetch without confirmation, ends the query
+                if not results or (not test_mode and page == 0 and not accept_query(keyword, data, max_results)):
+                    ends[query_id] = min(ends.get(query_id, page), page)
+                    continue
+
+                metrics.count('serp_results', len(results))
+                with metrics.timer('parse_results'):
+                    fetched[(query_id, page)] = parse_results(keyword, results)
+
+                # The result count on page one tells how many pages to request at once
+                if page == 0:
+                    total_results = data.get('search_information', {}).get('total_results', 0)
+                    planned[query_id] = max(1, min(-(-total_results // RESULTS_PER_PAGE), page_limit))
+                    for next_planned in range(1, planned[query_id]):
+                        push(query_id, next_planned)
+
+                # A short page is the last one
+                if len(results) < RESULTS_PER_PAGE:
+                    ends[query_id] = min(ends.get(query_id, page + 1), page + 1)
+                # Past the planned pages, carry on one page at a time while pages come back full
+                elif page + 1 >= planned[query_id] and page + 1 < page_limit:
+                    planned[query_id] = page + 2
+                    push(query_id, page + 1)
+
+            # Yield every page that is now complete in order
+            while next_query < len(queries):
+                if next_page < ends.get(next_query, next_page + 1) and (next_query, next_page) in fetched:
+                    yield next_query, fetched.pop((next_query, next_page))
+                    next_page += 1
+                elif outstanding[next_query] == 0:
+                    # Pages that came back after the end of the query are dropped
+                    for key in [key for key in fetched if key[0] == next_query]:
+                        del fetched[key]
+                    next_query, next_page = next_query + 1, 0
+                else:
+                    break
+
+
+def get_scholar_data_for_keyword(keyword, api_key, year_lo, year_hi, cites=None, test_mode=False, max_results=0,
+                                 session=None, rate_limiter=None, cache=None):
+    """
+    Fetches scholarly data for a given keyword using the SERP API.
+
+    Parameters:
+    - keyword (str): The keyword to search for.
+    - api_key (str): The API key for SERP API.
+    - year_lo (int): The starting year for the search range.
+    - year_hi (int): The ending year for the search range.
+    - cites (str, optional): The citation ID to filter results. Defaults to None.
+    - test_mode (bool, optional): If True, limits the search to 2 pages. Defaults to False.
+    - max_results (int, optional): Skips the search if it has more results than this. Defaults to 0 (no limit).
+    - session (requests.Session, optional): Session to reuse. Defaults to a new session.
+    - rate_limiter (RateLimiter, optional): Limiter shared with other requests. Defaults to None.
+    - cache (ResponseCache, optional): Cache to read pages from and store them in. Defaults to None.
+
+    Returns:
+    - list: A list of dictionaries containing scholarly data.
+    """
+
+    all_results = []
+    for _, entries in iter_scholar_data([(keyword, cites)], api_key, year_lo, year_hi, test_mode, max_results,
+                                        workers=1, session=session, rate_limiter=rate_limiter, cache=cache):
+        all_results.extend(entries)
+
+    return all_results
+
+
+def clean_df(d):
+    # Split the journal out of the query into the Publisher column
+    keyword_parts = d['Keyword'].str.partition('source:')
+    d['Publisher'] = keyword_parts[2].str.replace("\"", "", regex=False).where(keyword_parts[1] != "")
+
+    # Remove publisher info
+    d['Keyword'] = keyword_parts[0]
+
+    # Clean author string
+    d['Authors'] = d['Authors'].str.split(' -', n=1, regex=False).str[0]
+
+    # Get DOI from link: what follows 'id=', else what follows 'doi/', else the link itself
+    links = d['Link']
+    after_id = links.str.split('id=', regex=False).str[1]
+    after_doi = links.str.split('doi/', regex=False).str[1]
+    d['DOI_link'] = after_id.where(links.str.contains('id=', regex=False, na=False),
+                                   after_doi.where(links.str.contains('doi/', regex=False, na=False), links))
+
+    d.fillna("NA", inplace=True)
+
+
+def write_batch(writer, batch):
+    import pandas as pd
+
+    if batch:
+        with metrics.timer('write_results'):
+            df = pd.DataFrame(batch)
+            clean_df(df)
+            writer.write(df)
+
+
+def iter_search(keywords, api_key, journals=None, year_lo="1800", year_hi="2023", cites_list=(), test_mode=False,
+                max_results=0, workers=4, journal_batch=8, session=None, rate_limiter=None, cache=None):
+    """
+    Searches every keyword in every journal, yielding results as pages arrive.
+
+    Parameters:
+    - keywords (list): Keywords to search for.
+    - api_key (str): The API key for SERP API.
+    - journals (list, optional): Journals to search in. Defaults to None (all of Google Scholar).
+    - year_lo (str, optional): The starting year for the search range. Defaults to "1800".
+    - year_hi (str, optional): The ending year for the search range. Defaults to "2023".
+    - cites_list (list, optional): Citation IDs to filter results by. Defaults to none.
+    - test_mode (bool, optional): If True, limits each search to 2 pages. Defaults to False.
+    - max_results (int, optional): Skips searches with more results than this. Defaults to 0 (no limit).
+    - workers (int, optional): Maximum number of requests in flight. Defaults to 4.
+    - journal_batch (int, optional): Journals searched together in one query. Defaults to 8.
+    - session (requests.Session, optional): Session to reuse. Defaults to a new pooled session.
+    - rate_limiter (RateLimiter, optional): Limiter shared by all requests. Defaults to None.
+    - cache (ResponseCache, optional): Cache to read pages from and store them in. Defaults to None.
+
+    Yields:
+    - tuple: (keyword index, list of dictionaries containing scholarly data) for each page.
+    """
+    journals = journals or [None]
+    queries, query_keywords = build_queries(keywords, journals, cites_list)
+    session = session or make_session(workers)
+
+    # Journals are searched in batches, which are only split where they near Scholar's cap
+    planner = None
+    first_pages = None
+    if journals != [None] and journal_batch > 1:
+        planner = QueryPlanner(api_key, year_lo, year_hi, journal_batch, max_results, workers,
+                               session, rate_limiter, cache)
+        print(f"Planning {len(queries)} journal searches with {workers} workers...")
+        queries, query_keywords, first_pages = planner.plan(keywords, journals, cites_list)
+
+    print(f"Running {len(queries)} searches with {workers} workers...")
+
+    for query_id, results in iter_scholar_data(queries, api_key, year_lo, year_hi, test_mode, max_results,
+                                               workers, session, rate_limiter, cache, first_pages):
+        if planner:
+            results = planner.attribute(query_id, results)
+        if results:
+            yield query_keywords[query_id], results
+
+    # Results from a venue none of their batch's journals matched are looked for on page one of each
+    # of its journals' own searches, and get their Publisher from the search that finds them
+    if planner and planner.unmatched:
+        queries, query_keywords, batches = planner.fallback()
+        unmatched = sum(len(entries) for entries in planner.unmatched.values())
+        print(f"{unmatched} results matched none of their batch's journals, "
+              f"looking for them on the first page of {len(queries)} single-journal searches...")
+
+        for query_id, results in iter_scholar_data(queries, api_key, year_lo, year_hi, test_mode, max_results,
+                                                   workers, session, rate_limiter, cache, max_pages=1):
+            results = planner.resolve(batches[query_id], results)
+            if results:
+                yield query_keywords[query_id], results
+
+        left = 0
+        for keyword_id, results in planner.leftovers():
+            left += len(results)
+            yield keyword_id, results
+        if left:
+            print(f"{left} results could not be matched to a journal and have no Publisher")
+
+
+def search_articles(keywords, api_key, journals=None, year="1800:2023", cites_list=(), test_mode=False,
+                    max_results=0, workers=4, rate=5.0, journal_batch=8, cache=None):
+    """
+    Searches every keyword in every journal, as search.py does, without writing a file.
+
+    Parameters:
+    - year (str, optional): Year range in format year_lo:year_hi. Defaults to "1800:2023".
+    - rate (float, optional): Maximum requests per second to the SERP API. Defaults to 5 (0 for no limit).
+    - The other parameters are those of iter_search.
+
+    Returns:
+    - DataFrame: The cleaned results, with the columns of serp_articles_data.csv.
+    """
+    import pandas as pd
+
+    year_lo, year_hi = parse_years(year)
+    entries = [entry for _, results in iter_search(keywords, api_key, journals, year_lo, year_hi, cites_list,
+                                                   test_mode, max_results, workers, journal_batch,
+                                                   rate_limiter=RateLimiter(rate), cache=cache)
+               for entry in results]
+
+    df = pd.DataFrame(entries)
+    if entries:
+        clean_df(df)
+    return df
+
+
+def main():
+    args = parse_arg()
+    setup_metrics(args)
+    keywords = load_from_file(args.keyword_filepath)
+    journals = load_from_file(args.journal_filepath) if args.journal_filepath else [None]
+    
+    year_lo, year_hi = parse_years(args.year)
+    cites_list = args.cites.split(",") if args.cites else []
+    
+    test_mode = bool(int(args.test))
+    
+    total_keywords = len(keywords)
+    keywords_with_results = 0
+    keywords_without_results = 0
+    total_articles = 0
+    
+    queries, _ = build_queries(keywords, journals, cites_list)
+
+    batch = []
+    results_per_keyword = [0] * total_keywords
+    rate_limiter = RateLimiter(args.rate)
+    session = make_session(args.workers)
+
+    # Pages completed by an interrupted run with the same searches are replayed from the cache
+    cache = None
+    if not args.no_cache:
+        run = ResponseCache.make_key({"queries": queries, "year_lo": year_lo, "year_hi": year_hi,
+                                      "test": test_mode, "max_results": args.max_results,
+                                      "journal_batch": args.journal_batch})
+        cache = ResponseCache(args.cache, args.cache_ttl * 24 * 3600, args.cache_size * 1024 ** 2, run)
+
+    # Clean and export results in batches as pages arrive
+    with ResultWriter(args.output, NUMERIC_COLUMNS) as writer:
+        for keyword_id, results in iter_search(keywords, args.api_key, journals, year_lo, year_hi, cites_list,
+                                               test_mode, args.max_results, args.workers, args.journal_batch,
+                                               session, rate_limiter, cache):
+            results_per_keyword[keyword_id] += len(results)
+            batch.extend(results)
+
+            if len(batch) >= BATCH_SIZE:
+                write_batch(writer, batch)
+                batch = []
+
+        write_batch(writer, batch)
+
+    if cache:
+        cache.finish_run()
+        cache.close()
+
+    for keyword, total_results_for_keyword in zip(keywords, results_per_keyword):
+        if total_results_for_keyword > 0:
+            print(f"Found in total {total_results_for_keyword} results for {keyword} ✅")
+            keywords_with_results += 1
+            total_articles += total_results_for_keyword
+        else:
+            print(f"No results found for {keyword} ❌")
+            keywords_without_results += 1
+
+    print("\n--- Summary ---")
+    print(f"Number of keywords searched: {total_keywords}")
+    print(f"Number of keywords with no result: {keywords_without_results}")
+    print(f"Number of keywords with result: {keywords_with_results}")
+    print(f"Number of articles found: {total_articles}")
+    finish_metrics(args)
+
+if __name__ == "__main__":
+    main()
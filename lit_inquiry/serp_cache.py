@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ResponseCache:
+    # Persistent cache of SERP API responses keyed on the request parameters
+    def __init__(self, path, ttl=30 * 24 * 3600, max_bytes=500 * 1024 ** 2, run=None, checkpoint_age=None):
+        self.ttl = ttl # Seconds before an entry must be fetched again
+        self.max_bytes = max_bytes # Total compressed size kept on disk
+        self.run = run # Run whose completed pages are kept regardless of TTL
+        # Seconds the checkpoints of a run that never finished keep its pages, twice the TTL by default
+        self.checkpoint_age = 2 * ttl if checkpoint_age is None else checkpoint_age
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, body BLOB, size INTEGER, created REAL, accessed REAL)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS checkpoints (
+            run TEXT, key TEXT, created REAL, PRIMARY KEY (run, key))""")
+        # Checkpoints written before they had a creation time get one now
+        if 'created' not in [row[1] for row in self.conn.execute("PRAGMA table_info(checkpoints)")]:
+            self.conn.execute("ALTER TABLE checkpoints ADD COLUMN created REAL")
+            self.conn.execute("UPDATE checkpoints SET created = ?", (time.time(),))
+        self.conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (created)")
+        self.conn.commit()
+
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        with self.lock:
+            self.evict()
+            self.conn.commit()
+
+    # Content address of a request, leaving out the API key
+    @staticmethod
+    def make_key(params):
+        key_params = {k: str(v) for k, v in params.items() if k != 'api_key'}
+        return hashlib.sha256(json.dumps(key_params, sort_keys=True).encode()).hexdigest()
+
+    # Returns the cached response, or None if missing or expired
+    def get(self, params):
+        key = self.make_key(params)
+        now = time.time()
+
+        with self.lock:
+            row = self.conn.execute("""SELECT body, created,
+                EXISTS (SELECT 1 FROM checkpoints WHERE run = ? AND key = ? AND created >= ?)
+                FROM responses WHERE key = ?""", (self.run, key, now - self.checkpoint_age, key)).fetchone()
+
+            if row is None:
+                return None
+
+            body, created, checkpointed = row
+            if now - created > self.ttl and not checkpointed:
+                return None
+
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+
+        return json.loads(zlib.decompress(body))
+
+    # Stores a response and marks it as completed for the current run
+    def put(self, params, data):
+        key = self.make_key(params)
+        body = zlib.compress(json.dumps(data).encode())
+        now = time.time()
+
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                              (key, body, len(body), now, now))
+            if self.run:
+                self.conn.execute("INSERT OR IGNORE INTO checkpoints VALUES (?, ?, ?)", (self.run, key, now))
+
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self.evict()
+            self.conn.commit()
+
+    # Drops least recently used entries until the cache fits in max_bytes
+    # Checkpoints of runs that never finished stop protecting their pages after checkpoint_age
+    def evict(self):
+        self.conn.execute("DELETE FROM checkpoints WHERE created < ?", (time.time() - self.checkpoint_age,))
+
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        rows = self.conn.execute("""SELECT key, size FROM responses
+            WHERE key NOT IN (SELECT key FROM checkpoints) ORDER BY accessed""")
+
+        stale = []
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            stale.append((key,))
+            self.total_bytes -= size
+
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    # Forgets the checkpoint once a run has completed
+    def finish_run(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM checkpoints WHERE run = ?", (self.run,))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,5 @@
+# Command-line entry point, the code is in lit_inquiry/pdf_index.py
+from lit_inquiry.pdf_index import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+# Command-line entry point, the code is in lit_inquiry/pipeline.py
+from lit_inquiry.pipeline import main
+
+if __name__ == "__main__":
+    main()
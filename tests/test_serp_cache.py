@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from lit_inquiry.serp_cache import ResponseCache
+
+
+class UnfinishedRunTest(unittest.TestCase):
+    # A run that is killed never calls finish_run, so its checkpoints stay behind
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'cache.sqlite')
+        self.now = 1_000_000.0
+        patcher = mock.patch('lit_inquiry.serp_cache.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.folder.cleanup)
+
+    def fill(self, cache, prefix, pages):
+        for page in range(pages):
+            cache.put({'q': prefix, 'start': page}, {'organic_results': ['x' * 200 + str(page)]})
+
+    def checkpoints(self, cache):
+        return cache.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+
+    def test_checkpoints_protect_pages_past_the_ttl(self):
+        killed = ResponseCache(self.path, ttl=100, max_bytes=10 ** 6, run='killed')
+        self.fill(killed, 'a', 5)
+        killed.close()
+
+        # Past the TTL but within twice it, the same run resuming still gets its pages back
+        self.now += 150
+        resumed = ResponseCache(self.path, ttl=100, max_bytes=10 ** 6, run='killed')
+        self.assertIsNotNone(resumed.get({'q': 'a', 'start': 0}))
+        resumed.close()
+
+    def test_checkpoints_of_a_run_that_never_finishes_expire(self):
+        killed = ResponseCache(self.path, ttl=100, max_bytes=10 ** 6, run='killed')
+        self.fill(killed, 'a', 5)
+        size = killed.total_bytes
+        killed.close()
+
+        # Later runs with a bound smaller than the killed run's pages can still evict them
+        self.now += 201
+        cache = ResponseCache(self.path, ttl=100, max_bytes=size, run='other')
+        self.assertEqual(self.checkpoints(cache), 0)
+        self.fill(cache, 'b', 5)
+
+        self.assertLessEqual(cache.total_bytes, size)
+        self.assertIsNone(cache.get({'q': 'a', 'start': 0}))
+        self.assertIsNotNone(cache.get({'q': 'b', 'start': 4}))
+        cache.close()
+
+        # Nor does the killed run get stale pages back when it is finally rerun
+        rerun = ResponseCache(self.path, ttl=100, max_bytes=10 ** 6, run='killed')
+        self.assertIsNone(rerun.get({'q': 'a', 'start': 1}))
+        rerun.close()
+
+    def test_checkpoints_table_without_created_is_migrated(self):
+        cache = ResponseCache(self.path, ttl=100)
+        cache.conn.executescript("""
+            DROP TABLE checkpoints;
+            CREATE TABLE checkpoints (run TEXT, key TEXT, PRIMARY KEY (run, key));
+            INSERT INTO checkpoints VALUES ('old', 'k');""")
+        cache.close()
+
+        cache = ResponseCache(self.path, ttl=100)
+        self.assertEqual(self.checkpoints(cache), 1)
+        self.now += 201
+        cache.put({'q': 'c'}, {})
+        self.assertEqual(self.checkpoints(cache), 0)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()